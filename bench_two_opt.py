@@ -0,0 +1,55 @@
+import random
+import sys
+import time
+import util
+from cvrp import CVRP
+
+
+def two_opt_move_rebuild(soln, cvrp, r, i, j):
+    """"Former 2-opt move: rebuild route r with segment [i...j] reversed (three new lists per move)"""
+    d, route = cvrp.d, soln.s[r]
+    delta = d[route[i - 1]][route[j]] + d[route[i]][route[j + 1]] \
+            - d[route[i - 1]][route[i]] - d[route[j]][route[j + 1]]
+    soln.fs += delta
+    soln.dist[r] += delta
+    soln.s[r] = route[0:i] + list(reversed(route[i:j + 1])) + route[j + 1:]
+    soln.update_index(r, i, j + 1)
+    return soln
+
+
+def random_moves(soln, n_moves):
+    """"Sample random 2-opt moves (r, i, j) on routes with at least two customers"""
+    R = [r for r in range(len(soln.s)) if len(soln.s[r]) > 3]
+    moves = []
+    for _ in range(n_moves):
+        r = random.choice(R)
+        i, j = sorted(random.sample(range(1, len(soln.s[r]) - 1), 2))
+        moves.append((r, i, j))
+    return moves
+
+
+def main(args):
+    """"Micro-benchmark of accepted 2-opt moves per second: in-place reversal versus route rebuild"""
+    instance = args[1] if len(args) > 1 else "datasets/Li_21.vrp"
+    n_moves = int(args[2]) if len(args) > 2 else 200000
+    random.seed(0)
+    d, dem, cap, coord = util.read_cvrp(instance)
+    cvrp = CVRP(d, dem, cap, coord)
+    soln, t = cvrp.greedy_build_savings()
+    moves = random_moves(soln, n_moves)
+    print(f"{instance}: {len(soln.s)} routes, {max(len(route) for route in soln.s) - 2} max stops, {n_moves} moves")
+    results = []
+    for name, move in (("rebuild", lambda s, r, i, j: two_opt_move_rebuild(s, cvrp, r, i, j)),
+                       ("in-place", lambda s, r, i, j: s.two_opt_move(cvrp, r, i, j))):
+        soln_ = soln.copy()
+        t_init = time.perf_counter()
+        for (r, i, j) in moves:
+            move(soln_, r, i, j)
+        t = time.perf_counter() - t_init
+        results.append(soln_.s)
+        print(f"  {name:10s}: {t:8.3f} s  |  {n_moves / t:12.0f} moves/s")
+    assert results[0] == results[1], "implementations diverged"
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,213 @@
+import random
+import numpy as np
+from solution import Solution
+
+
+def tour_of(soln):
+    """Giant tour of a solution (its customers, route after route)"""
+    return [x for route in soln.s for x in route[1:-1]]
+
+
+def cut_points(n):
+    """Two random cut points c1 < c2 of a giant tour of n customers, [c1, c2) being the segment to keep"""
+    cut = random.sample(range(1, n - 1), 2)
+    cut.sort()
+    return cut[0], cut[1] + 1
+
+
+def ox_child(tour_one, tour_two, c1, c2, n_nodes):
+    """Order crossover child: the segment [c1, c2) of tour_one, the other customers in the order of tour_two (starting
+    from c2 and wrapping around)"""
+    n = len(tour_one)
+    child = [0] * n
+    child[c1:c2] = tour_one[c1:c2]
+    used = bytearray(n_nodes)
+    for x in tour_one[c1:c2]:
+        used[x] = 1
+    position = c2 % n
+    for x in tour_two[c2:] + tour_two[:c2]:
+        if not used[x]:
+            child[position] = x
+            position = (position + 1) % n
+    return child
+
+
+def ox(cvrp, parent_one, parent_two):
+    """Order crossover (OX) of the giant tours of two parents, children are optimally split into routes"""
+    tour_one, tour_two = tour_of(parent_one), tour_of(parent_two)
+    c1, c2 = cut_points(len(tour_one))
+    n_nodes = len(cvrp.dem)
+    return (cvrp.split(ox_child(tour_one, tour_two, c1, c2, n_nodes)),
+            cvrp.split(ox_child(tour_two, tour_one, c1, c2, n_nodes)))
+
+
+def pmx_child(tour_one, tour_two, c1, c2, n_nodes):
+    """Partially mapped crossover child: the segment [c1, c2) of tour_one, the customers of tour_two in its segment
+    placed by following the mapping between both segments, and the others at their positions in tour_two"""
+    n = len(tour_one)
+    child = [-1] * n
+    child[c1:c2] = tour_one[c1:c2]
+    pos_two = [0] * n_nodes
+    for i, x in enumerate(tour_two):
+        pos_two[x] = i
+    used = bytearray(n_nodes)
+    for x in tour_one[c1:c2]:
+        used[x] = 1
+    # each mapping chain is followed once, from the customer of tour_two that is missing in the child
+    for i in range(c1, c2):
+        x = tour_two[i]
+        if used[x]:
+            continue
+        j = i
+        while c1 <= j < c2:
+            j = pos_two[tour_one[j]]
+        child[j] = x
+        used[x] = 1
+    for i in range(n):
+        if child[i] < 0:
+            child[i] = tour_two[i]
+    return child
+
+
+def pmx(cvrp, parent_one, parent_two):
+    """Partially mapped crossover (PMX) of the giant tours of two parents, children are optimally split into routes"""
+    tour_one, tour_two = tour_of(parent_one), tour_of(parent_two)
+    c1, c2 = cut_points(len(tour_one))
+    n_nodes = len(cvrp.dem)
+    return (cvrp.split(pmx_child(tour_one, tour_two, c1, c2, n_nodes)),
+            cvrp.split(pmx_child(tour_two, tour_one, c1, c2, n_nodes)))
+
+
+def erx_child(tour_one, tour_two, n_nodes):
+    """Edge recombination child: starting from the first customer of tour_one, move to the neighbor (in either parent)
+    with the fewest remaining neighbors, or to a random unvisited customer when there is none"""
+    adj = [[] for _ in range(n_nodes)]
+    for tour in (tour_one, tour_two):
+        for i in range(len(tour)):
+            a, b = tour[i - 1], tour[i]
+            if b not in adj[a]:  # at most four neighbors
+                adj[a].append(b)
+                adj[b].append(a)
+    # unvisited customers, with their positions in it for O(1) removal
+    unvisited = tour_one[:]
+    pos = [0] * n_nodes
+    for i, x in enumerate(unvisited):
+        pos[x] = i
+    child = []
+    x = tour_one[0]
+    while True:
+        child.append(x)
+        # remove x from the unvisited customers and the neighbor lists
+        i, last = pos[x], unvisited[-1]
+        unvisited[i], pos[last] = last, i
+        unvisited.pop()
+        for y in adj[x]:
+            adj[y].remove(x)
+        if not unvisited:
+            break
+        if adj[x]:
+            n_min = min(len(adj[y]) for y in adj[x])
+            x = random.choice([y for y in adj[x] if len(adj[y]) == n_min])
+        else:
+            x = random.choice(unvisited)
+    return child
+
+
+def erx(cvrp, parent_one, parent_two):
+    """Edge recombination crossover (ERX) of the giant tours of two parents, children are optimally split into routes"""
+    tour_one, tour_two = tour_of(parent_one), tour_of(parent_two)
+    n_nodes = len(cvrp.dem)
+    return (cvrp.split(erx_child(tour_one, tour_two, n_nodes)),
+            cvrp.split(erx_child(tour_two, tour_one, n_nodes)))
+
+
+def srex_child(cvrp, parent_one, parent_two):
+    """Selective route exchange child: a random subset of routes of parent_one replaces the routes of parent_two that
+    share the most customers with it. The other routes of parent_two lose the customers of the subset, and the
+    customers left out are inserted at their cheapest feasible positions (in new routes if there are none), next to
+    their granular neighbors when the candidate index is built"""
+    dem = cvrp.dem
+    routes_one = [route for route in parent_one.s if len(route) > 2]
+    routes_two = [r for r in range(len(parent_two.s)) if len(parent_two.s[r]) > 2]
+    k = random.randint(1, max(1, min(len(routes_one), len(routes_two)) // 2))
+    routes_a = random.sample(routes_one, k)
+    in_a = bytearray(len(dem))
+    for route in routes_a:
+        for x in route[1:-1]:
+            in_a[x] = 1
+    # routes of parent_two sharing the most customers with the subset
+    shared = [0] * len(parent_two.s)
+    for route in routes_a:
+        for x in route[1:-1]:
+            shared[parent_two.route_of[x]] += 1
+    routes_b = set(sorted(routes_two, key=lambda r: -shared[r])[:k])
+    s = [route[:] for route in routes_a]
+    missing = []
+    for r in routes_two:
+        route = parent_two.s[r]
+        if r in routes_b:
+            missing.extend(x for x in route[1:-1] if not in_a[x])
+        else:
+            route = [x for x in route if not in_a[x]]
+            if len(route) > 2:
+                s.append(route)
+    # cheapest insertions of the customers left out: next to their granular neighbors (route_of and pos_of locate the
+    # customers of the child) when the candidate index is built, O(k + route length) each. Otherwise, or if no
+    # neighbor is in a route with room for it, over all routes with room: each route keeps the cheapest insertion of
+    # every missing customer (rows), computed on first use and again only once the route gets a customer
+    cap = [sum(dem[x] for x in route) for route in s]
+    route_of, pos_of = [-1] * len(dem), [0] * len(dem)
+    for r, route in enumerate(s):
+        for p in range(1, len(route) - 1):
+            route_of[route[p]], pos_of[route[p]] = r, p
+    d, D, M = cvrp.d, cvrp.d_arr, np.asarray(missing, dtype=np.int64)
+    rows = []  # (m0, costs, positions) of the cheapest insertions of missing[m0:] in each route, None if stale
+    for m, x in enumerate(missing):
+        best, r_best, p_best = float("inf"), -1, 0
+        if cvrp.neigh is not None:
+            for v in cvrp.neigh[x]:
+                r = route_of[v]
+                if v == 0 or r < 0 or cap[r] + dem[x] > cvrp.cap:
+                    continue
+                route = s[r]
+                for e in (pos_of[v] - 1, pos_of[v]):  # edges (route[e], route[e + 1]) next to v
+                    delta = d[route[e]][x] + d[x][route[e + 1]] - d[route[e]][route[e + 1]]
+                    if delta < best:
+                        best, r_best, p_best = delta, r, e + 1
+        if r_best < 0:
+            rows.extend([None] * (len(s) - len(rows)))
+            for r, route in enumerate(s):
+                if cap[r] + dem[x] > cvrp.cap:
+                    continue
+                if rows[r] is None:
+                    a = np.asarray(route)[:, None]
+                    delta = D[a[:-1], M[m:]].astype(np.float64) + D[M[m:], a[1:]] - D[a[:-1], a[1:]]
+                    e = np.argmin(delta, axis=0)
+                    rows[r] = m, delta[e, np.arange(len(e))].tolist(), (e + 1).tolist()
+                m0, costs, positions = rows[r]
+                if costs[m - m0] < best:
+                    best, r_best, p_best = costs[m - m0], r, positions[m - m0]
+        if r_best < 0:
+            s.append([0, x, 0])
+            cap.append(dem[x])
+            route_of[x], pos_of[x] = len(s) - 1, 1
+        else:
+            route = s[r_best]
+            route.insert(p_best, x)
+            cap[r_best] += dem[x]
+            if r_best < len(rows):
+                rows[r_best] = None
+            route_of[x] = r_best
+            for p in range(p_best, len(route) - 1):
+                pos_of[route[p]] = p
+    soln = Solution(s, 0).eval_routes(cvrp)
+    soln.fs = sum(soln.dist)
+    return soln
+
+
+def srex(cvrp, parent_one, parent_two):
+    """Selective route exchange crossover (SREX) of the routes of two parents (Nagata and Kobayashi, 2010)"""
+    return srex_child(cvrp, parent_one, parent_two), srex_child(cvrp, parent_two, parent_one)
+
+
+OPERATORS = {"OX": ox, "PMX": pmx, "ERX": erx, "SREX": srex}
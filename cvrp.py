@@ -1,3 +1,4 @@
+import collections
 import random
 from solution import Solution
 import time
@@ -7,157 +8,251 @@ import math
 class CVRP:
     def __init__(self, d, dem, cap, coord):
         self.n = len(d)  # problem size (number of nodes)
-        self.d = d  # distance matrix
-        self.dem = dem  # demand list for each node
+        # distances and demands are kept in contiguous arrays (d_arr, dem_arr) for vectorized code, while d and dem
+        # are zero-copy memoryviews over the same buffers for fast scalar access as d[i][j] and dem[i]
+        self.d_arr = np.ascontiguousarray(d, dtype=d.dtype if isinstance(d, np.ndarray) else np.float64)
+        self.dem_arr = np.ascontiguousarray(dem, dtype=np.float64)
+        self.d = [memoryview(row) for row in self.d_arr]  # distance matrix (one view per row)
+        self.dem = memoryview(self.dem_arr)  # demand list for each node
         self.cap = cap  # capacity of the vehicle (homogeneous fleet)
         self.coord = coord  # coordinates for each node
         self.v = math.ceil(np.sum(self.dem) / self.cap)
+        self.neigh_arr = None  # granular candidate index: k nearest nodes of each node (None = full neighborhoods)
+        self.neigh = None
+        self.neigh_sym = None  # symmetric candidate lists (see symmetric_neighbors)
+
+    def build_neighbors(self, k, block=1024):
+        """Build the granular candidate index with the k nearest nodes (depot included) of each node, sorted by
+        distance. Once built, full-scan neighborhoods only evaluate moves creating at least one of these edges"""
+        k = min(k, self.n - 1)
+        self.neigh_arr = np.empty((self.n, k), dtype=np.int64)
+        for b in range(0, self.n, block):
+            dist = self.d_arr[b:b + block].astype(np.float64)
+            rows = np.arange(len(dist))
+            dist[rows, b + rows] = np.inf  # a node is not its own neighbor
+            idx = np.argpartition(dist, k - 1, axis=1)[:, :k]
+            order = np.argsort(np.take_along_axis(dist, idx, axis=1), axis=1, kind="stable")
+            self.neigh_arr[b:b + block] = np.take_along_axis(idx, order, axis=1)
+        self.neigh = self.neigh_arr.tolist()
+        self.neigh_sym = None
+        return self.neigh
+
+    def symmetric_neighbors(self):
+        """Get the symmetric granular candidate lists (built on first use): v is a candidate of u if either one is among
+        the k nearest nodes of the other"""
+        if self.neigh_sym is None:
+            sym = [set(row) for row in self.neigh]
+            for u in range(len(self.neigh)):
+                for v in self.neigh[u]:
+                    sym[v].add(u)
+            self.neigh_sym = [sorted(row) for row in sym]
+        return self.neigh_sym
 
     # Constructive methods
-    def greedy_build(self):
-        """"Greedy initial solution build by nearest neighbor heuristic"""
+    def greedy_build(self, split=False):
+        """"Greedy initial solution build by nearest neighbor heuristic. If split is set, a giant tour is built ignoring
+        the vehicle capacity and then optimally split into routes (route-first cluster-second)"""
         t_init = time.time()
+        cap_max = float("inf") if split else self.cap
         s = [[0]]
         fs = 0
         cap = [0]
+        dist = [0]
         C = [i for i in range(1, self.n)]
         while len(C) != 0:
             # select c_min (nearest neighbor within capacity)
             val_min = float("inf")
             c_min = -1
             for c in C:
-                if self.d[s[-1][-1]][c] < val_min and cap[-1] + self.dem[c] <= self.cap:
+                if self.d[s[-1][-1]][c] < val_min and cap[-1] + self.dem[c] <= cap_max:
                     val_min = self.d[s[-1][-1]][c]
                     c_min = c
             # insert c_min into s
             if c_min != -1:
                 s[-1].append(c_min)
                 fs += val_min
+                dist[-1] += val_min
                 cap[-1] += self.dem[c_min]
                 C.remove(c_min)
             else:
                 s[-1].append(0)
-                fs += self.d[s[-1][-2]][s[-1][-1]]
+                arc = self.d[s[-1][-2]][s[-1][-1]]
+                fs += arc
+                dist[-1] += arc
                 s.append([0])
                 cap.append(0)
+                dist.append(0)
         # add first node to close the cycle
-        fs += self.d[s[-1][-1]][s[-1][0]]
+        arc = self.d[s[-1][-1]][s[-1][0]]
+        fs += arc
+        dist[-1] += arc
         s[-1].append(s[-1][0])
-        return Solution(s, fs, cap), time.time() - t_init
-
-    def can_merge(self, i, j, s):
-        """Auxiliary function to determine whether routes of i and j can be merged"""
-        res_dem = 0
-        for route_idx in range(len(s)):
-            i_in_idx = i in s[route_idx]
-            j_in_idx = j in s[route_idx]
-            if i_in_idx and j_in_idx:
-                # belong to the same route
-                return False
-            elif i_in_idx and s[route_idx].index(i) not in [1, len(s[route_idx]) - 2]:
-                # i is interior on its route
-                return False
-            elif j_in_idx and s[route_idx].index(j) not in [1, len(s[route_idx]) - 2]:
-                # j is interior on its route
-                return False
-            if i_in_idx:
-                for x in s[route_idx]:
-                    res_dem += self.dem[x]
-            if j_in_idx:
-                for x in s[route_idx]:
-                    res_dem += self.dem[x]
-        if res_dem > self.cap:
-            return False
-        return True
+        if split:
+            return self.split(s[0][1:-1]), time.time() - t_init
+        return Solution(s, fs, cap, dist), time.time() - t_init
 
-    def greedy_build_savings(self):
-        """"Greedy initial solution build by Savings heuristic"""
+    def greedy_build_savings(self, granular=False):
+        """"Greedy initial solution build by Savings heuristic. Savings are computed and sorted with NumPy and route
+        endpoints and loads are kept in union-find maps. If granular is set (and the candidate index is built), only
+        savings between k-nearest neighbors are considered"""
         t_init = time.time()
-        s = []
         fs = 0
-        cap = []
-        for i in range(1, len(self.d)):
-            s.append([])
-            s[-1].append(0)
-            s[-1].append(i)
-            s[-1].append(0)
+        for i in range(1, self.n):
             fs += 2 * self.d[0][i]
-            cap.append(self.dem[i])
-        # calculate savings
-        saving_options = []
-        for i in range(1, len(self.d)):
-            for j in range(i + 1, len(self.d)):
-                sav = self.d[i][0] + self.d[0][j] - self.d[i][j]
-                saving_options.append((i, j, sav))
-        saving_options.sort(key=lambda elem: elem[2], reverse=True)
-        while saving_options:
-            # chooses the max feasible savings
-            (max_i, max_j, max_sav) = saving_options.pop(0)
-            if self.can_merge(max_i, max_j, s):
-                # merge routes from max_i and max_j
-                rem_dem = -1
-                for idx in range(len(s)):
-                    if max_j in s[idx]:
-                        sub_j = s[idx][1:-1]
-                        s.pop(idx)
-                        rem_dem = cap[idx]
-                        cap.pop(idx)
-                        break
-                for idx in range(len(s)):
-                    if max_i == s[idx][1] and sub_j[-1] == max_j:
-                        s[idx] = [0] + sub_j[:] + s[idx][1:-1] + [0]
-                        cap[idx] += rem_dem
-                        break
-                    elif max_i == s[idx][1] and sub_j[0] == max_j:
-                        s[idx] = [0] + list(reversed(sub_j)) + s[idx][1:-1] + [0]
-                        cap[idx] += rem_dem
-                        break
-                    elif max_i == s[idx][-2] and sub_j[-1] == max_j:
-                        s[idx] = [0] + s[idx][1:-1] + list(reversed(sub_j)) + [0]
-                        cap[idx] += rem_dem
-                        break
-                    elif max_i == s[idx][-2] and sub_j[0] == max_j:
-                        s[idx] = [0] + s[idx][1:-1] + sub_j + [0]
-                        cap[idx] += rem_dem
-                        break
-                fs -= max_sav
-        return Solution(s, fs, cap), time.time() - t_init
+        # calculate savings of customer pairs i < j, sorted (stable) by decreasing value
+        if granular and self.neigh_arr is not None:
+            I = np.repeat(np.arange(self.n), self.neigh_arr.shape[1])
+            J = self.neigh_arr.ravel()
+            I, J = np.minimum(I, J), np.maximum(I, J)
+            pairs = np.unique(I[I > 0] * self.n + J[I > 0])
+            I, J = pairs // self.n, pairs % self.n
+        else:
+            I, J = np.triu_indices(self.n - 1, 1)
+            I, J = I + 1, J + 1
+        sav = self.d_arr[I, 0].astype(np.float64) + self.d_arr[0, J] - self.d_arr[I, J]
+        order = np.argsort(-sav, kind="stable")
+        # each route is a union-find set whose root keeps its endpoints and load (a route keeps the slot of its root)
+        parent = list(range(self.n))
+        first = list(range(self.n))
+        last = list(range(self.n))
+        load = self.dem.tolist()
+        adj = [[] for _ in range(self.n)]
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
 
-    def part_greedy_build(self, alpha):
-        """Partially greedy initial solution based on nearest neighbor heuristic"""
+        for (i, j, s_ij) in zip(I[order].tolist(), J[order].tolist(), sav[order].tolist()):
+            r_i, r_j = find(i), find(j)
+            if r_i == r_j or load[r_i] + load[r_j] > self.cap:
+                # same route or capacity exceeded
+                continue
+            if i not in (first[r_i], last[r_i]) or j not in (first[r_j], last[r_j]):
+                # i or j is interior on its route
+                continue
+            # merge route from j into route from i
+            if i == first[r_i] and j == last[r_j]:
+                first[r_i] = first[r_j]
+            elif i == first[r_i] and j == first[r_j]:
+                first[r_i] = last[r_j]
+            elif i == last[r_i] and j == last[r_j]:
+                last[r_i] = first[r_j]
+            else:
+                last[r_i] = last[r_j]
+            parent[r_j] = r_i
+            load[r_i] += load[r_j]
+            adj[i].append(j)
+            adj[j].append(i)
+            fs -= s_ij
+        # unroll routes from their first endpoint
+        s = []
+        cap = []
+        dist = []
+        for r in range(1, self.n):
+            if parent[r] != r:
+                continue
+            route = [0]
+            prev, cur = 0, first[r]
+            while cur is not None:
+                route.append(cur)
+                prev, cur = cur, next((v for v in adj[cur] if v != prev), None)
+            route.append(0)
+            s.append(route)
+            cap.append(load[r])
+            dist.append(sum(self.d[route[idx]][route[idx + 1]] for idx in range(len(route) - 1)))
+        return Solution(s, fs, cap, dist), time.time() - t_init
+
+    def part_greedy_build(self, alpha, split=False):
+        """Partially greedy initial solution based on nearest neighbor heuristic. If split is set, a giant tour is built
+        ignoring the vehicle capacity and then optimally split into routes (route-first cluster-second)"""
         t_init = time.time()
+        cap_max = float("inf") if split else self.cap
         s = [[0]]
         fs = 0
         cap = [0]
+        dist = [0]
         C = [i for i in range(1, self.n)]
         while len(C) != 0:
             # calculate g_min and g_max
             g_max = float("-inf")
             g_min = float("inf")
             for c in C:
-                if self.d[s[-1][-1]][c] < g_min and cap[-1] + self.dem[c] <= self.cap:
+                if self.d[s[-1][-1]][c] < g_min and cap[-1] + self.dem[c] <= cap_max:
                     g_min = self.d[s[-1][-1]][c]
-                if self.d[s[-1][-1]][c] > g_max and cap[-1] + self.dem[c] <= self.cap:
+                if self.d[s[-1][-1]][c] > g_max and cap[-1] + self.dem[c] <= cap_max:
                     g_max = self.d[s[-1][-1]][c]
             # create restricted list of candidates (LCR)
             LCR = []
             for c in C:
-                if self.d[s[-1][-1]][c] <= g_min + alpha * (g_max - g_min) and cap[-1] + self.dem[c] <= self.cap:
+                if self.d[s[-1][-1]][c] <= g_min + alpha * (g_max - g_min) and cap[-1] + self.dem[c] <= cap_max:
                     LCR.append(c)
             if LCR:
                 # randomly select c among the alpha best candidates and insert into s
                 c = random.choice(LCR)
                 s[-1].append(c)
-                fs += self.d[s[-1][-2]][s[-1][-1]]
+                arc = self.d[s[-1][-2]][s[-1][-1]]
+                fs += arc
+                dist[-1] += arc
                 cap[-1] += self.dem[c]
                 C.remove(c)
             else:
                 # close current route and start a new one
                 s[-1].append(0)
-                fs += self.d[s[-1][-2]][s[-1][-1]]
+                arc = self.d[s[-1][-2]][s[-1][-1]]
+                fs += arc
+                dist[-1] += arc
                 s.append([0])
                 cap.append(0)
+                dist.append(0)
         # add first node to close the cycle
-        fs += self.d[s[-1][-1]][s[-1][0]]
+        arc = self.d[s[-1][-1]][s[-1][0]]
+        fs += arc
+        dist[-1] += arc
         s[-1].append(s[-1][0])
-        return Solution(s, fs, cap), time.time() - t_init
+        if split:
+            return self.split(s[0][1:-1]), time.time() - t_init
+        return Solution(s, fs, cap, dist), time.time() - t_init
+
+    def split(self, tour):
+        """"Optimal split of a giant tour (sequence of customers) into routes within the vehicle capacity, in O(n) with
+        the monotone queue algorithm of Vidal (2016) https://doi.org/10.1016/j.cor.2015.11.012"""
+        d, dem, n = self.d, self.dem, len(tour)
+        t = [0] + list(tour)  # 1-based positions
+        D = [0.0] * (n + 1)  # distance along the tour from t[1] to t[k]
+        Q = [0.0] * (n + 1)  # load of t[1...k]
+        for k in range(1, n + 1):
+            Q[k] = Q[k - 1] + dem[t[k]]
+            if k > 1:
+                D[k] = D[k - 1] + d[t[k - 1]][t[k]]
+        p = [0.0] * (n + 1)  # cost of the best split of t[1...k]
+        pred = [0] * (n + 1)
+        key = [0.0] * (n + 1)  # part of the cost of route t[i + 1...j] that depends on i only
+        key[0] = d[0][t[1]] - D[1] if n else 0.0
+        queue = collections.deque([0])  # candidate predecessors: increasing positions and keys
+        for j in range(1, n + 1):
+            # the front is the best feasible predecessor of j
+            i = queue[0]
+            p[j] = key[i] + D[j] + d[t[j]][0]
+            pred[j] = i
+            if j < n:
+                key[j] = p[j] + d[0][t[j + 1]] - D[j + 1]
+                # j is dominated by the back if it is not better and has the same load (zero demand customers)
+                if not (key[queue[-1]] <= key[j] and Q[queue[-1]] == Q[j]):
+                    while queue and key[j] <= key[queue[-1]]:
+                        queue.pop()
+                    queue.append(j)
+                # drop predecessors whose route to j + 1 exceeds the vehicle capacity
+                while Q[j + 1] - Q[queue[0]] > self.cap:
+                    queue.popleft()
+        # routes from the predecessors
+        s = []
+        j = n
+        while j > 0:
+            s.append([0] + t[pred[j] + 1:j + 1] + [0])
+            j = pred[j]
+        s.reverse()
+        soln = Solution(s, 0).eval_routes(self)
+        soln.fs = sum(soln.dist)
+        return soln
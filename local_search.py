@@ -1,36 +1,92 @@
 import random
 import time
+import numpy as np
 
 EPS = 0.0001  # to avoid numerical issues when comparing float values
 MAX_K = 2  # number of neighborhood structures
+_TRIU_PAIRS = {}  # index pair arrays of the 2-opt neighborhood by route length (see triu_pairs)
+
+
+# =================================== Granular candidate moves =========================================================
+def two_opt_pairs(cvrp, route):
+    """Get the (i, j) index pairs of the same route 2-opt neighborhood of a route. When the granular candidate index
+    (cvrp.neigh) is built, only pairs creating at least one edge to a k-nearest neighbor are returned"""
+    if cvrp.neigh is None:
+        return ((i, j) for i in range(1, len(route) - 1) for j in range(i + 1, len(route) - 1))
+    pos = {route[idx]: idx for idx in range(len(route))}  # depot maps to the last position
+    C = set()
+    for i in range(1, len(route) - 1):
+        for v in cvrp.neigh[route[i - 1]]:  # new edge (route[i - 1], route[j])
+            j = pos.get(v)
+            if j is not None and i < j < len(route) - 1:
+                C.add((i, j))
+        for v in cvrp.neigh[route[i]]:  # new edge (route[i], route[j + 1])
+            j = pos.get(v)
+            if j is not None and i + 1 < j:
+                C.add((i, j - 1))
+    return sorted(C)
+
+
+def inter_swap_quads(cvrp, soln, routes=None):
+    """Get the (r1, r2, i, j) indexes of the inter-route swap neighborhood (r1 < r2), or only of the swaps touching the
+    given routes. When the granular candidate index (cvrp.neigh) is built, only swaps of customers that are k-nearest
+    neighbors of each other are returned, found from the customers of the given routes"""
+    if cvrp.neigh is None:
+        return ((r1, r2, i, j) for r1 in range(len(soln.s)) for i in range(1, len(soln.s[r1]) - 1)
+                for r2 in range(r1 + 1, len(soln.s)) for j in range(1, len(soln.s[r2]) - 1)
+                if routes is None or r1 in routes or r2 in routes)
+    neigh = cvrp.symmetric_neighbors()
+    nodes = range(1, len(neigh)) if routes is None else [u for r in routes for u in soln.s[r][1:-1]]
+    C = set()
+    for u in nodes:
+        r1, i = soln.locate(u)
+        for v in neigh[u]:
+            if v == 0:
+                continue
+            r2, j = soln.locate(v)
+            if r1 < r2:
+                C.add((r1, r2, i, j))
+            elif r2 < r1:
+                C.add((r2, r1, j, i))
+    return sorted(C)
 
 
 # =================================== Getting same route 2-opt neighbors ===============================================
-def get_two_opt_neighbors(cvrp, soln):
-    """Get all neighbors regarding same route 2-opt neighborhood. A neighbor represented as: [fs, r, i, j]"""
-    N = []
-    for r in range(len(soln.s)):
-        for i in range(1, len(soln.s[r]) - 1):
-            for j in range(i + 1, len(soln.s[r]) - 1):
-                fs_ = soln.two_opt_eval(cvrp, r, i, j)
-                if fs_ + EPS < soln.fs:
-                    # add improvement neighbor
-                    N.append((fs_, r, i, j))
-    return N
-
-
-def get_two_opt_first_neighbor(cvrp, soln):
-    """Get first neighbor regarding same route 2-opt neighborhood. A neighbor represented as: [fs, r, i, j]"""
-    N = []
-    for r in range(len(soln.s)):
-        for i in range(1, len(soln.s[r]) - 1):
-            for j in range(i + 1, len(soln.s[r]) - 1):
-                fs_ = soln.two_opt_eval(cvrp, r, i, j)
-                if fs_ + EPS < soln.fs:
-                    # return improvement neighbor
-                    N.append((fs_, r, i, j))
-                    return N
-    return N
+def two_opt_evals(cvrp, soln, routes=None, fs=None):
+    """Evaluate at once (vectorized) all same route 2-opt moves of the solution (or of the given routes), or only the
+    granular candidates if the candidate index is built. Returns arrays R, I, J and FS with route, indexes (i < j) and
+    cost of each move (from fs, by default the solution cost), ordered by (r, i, j)"""
+    routes = range(len(soln.s)) if routes is None else routes
+    fs = soln.fs if fs is None else fs
+    giant, R, GI, GJ, OFF = [], [], [], [], []  # positions GI and GJ refer to the giant tour (routes concatenated)
+    for r in routes:
+        route, off = soln.s[r], len(giant)
+        OFF.append(off)
+        if cvrp.neigh is None:
+            I, J = triu_pairs(len(route))
+            GI.append(I + off)
+            GJ.append(J + off)
+            R.append(np.full(len(I), r))
+        else:
+            pairs = two_opt_pairs(cvrp, route)
+            GI.append(np.fromiter((i + off for i, j in pairs), dtype=np.int64, count=len(pairs)))
+            GJ.append(np.fromiter((j + off for i, j in pairs), dtype=np.int64, count=len(pairs)))
+            R.append(np.full(len(pairs), r))
+        giant.extend(route)
+    a, D = np.asarray(giant), cvrp.d_arr
+    R, GI, GJ = np.concatenate(R), np.concatenate(GI), np.concatenate(GJ)
+    # same evaluation (and float operation order) as Solution.two_opt_eval
+    FS = np.float64(fs) + D[a[GI - 1], a[GJ]] + D[a[GI], a[GJ + 1]] - D[a[GI - 1], a[GI]] - D[a[GJ], a[GJ + 1]]
+    off = np.repeat(OFF, [len(soln.s[r]) for r in routes])[GI]
+    return R, GI - off, GJ - off, FS
+
+
+def triu_pairs(length):
+    """Get (cached) arrays I and J with all index pairs 1 <= i < j <= length - 2 of a route, ordered by (i, j)"""
+    if length not in _TRIU_PAIRS:
+        I, J = np.triu_indices(max(length - 2, 0), 1)
+        _TRIU_PAIRS[length] = (I + 1, J + 1)
+    return _TRIU_PAIRS[length]
 
 
 def get_two_opt_random_neighbor(cvrp, soln):
@@ -51,33 +107,62 @@ def get_two_opt_random_neighbor(cvrp, soln):
 
 
 # =================================== Getting inter-route swap neighbors ===============================================
-def get_inter_best_swap_neighbors(cvrp, soln):
-    """Get all neighbors regarding inter-route swap neighborhood. A neighbor represented as: [fs, r1, r2, i, j]"""
-    N = []
-    for r1 in range(len(soln.s)):
-        for i in range(1, len(soln.s[r1]) - 1):
-            for r2 in range(r1 + 1, len(soln.s)):
-                for j in range(1, len(soln.s[r2]) - 1):
-                    fs_ = soln.inter_best_swap_eval(cvrp, r1, r2, i, j)
-                    if fs_ + EPS < soln.fs:
-                        # add improvement neighbor
-                        N.append((fs_, r1, r2, i, j))
-    return N
-
-
-def get_inter_best_swap_first_neighbor(cvrp, soln):
-    """Get first neighbor regarding inter-route swap neighborhood. A neighbor represented as: [fs, r1, r2, i, j]"""
-    N = []
-    for r1 in range(len(soln.s)):
-        for i in range(1, len(soln.s[r1]) - 1):
-            for r2 in range(r1 + 1, len(soln.s)):
-                for j in range(1, len(soln.s[r2]) - 1):
-                    fs_ = soln.inter_best_swap_eval(cvrp, r1, r2, i, j)
-                    if fs_ + EPS < soln.fs:
-                        # return improvement neighbor
-                        N.append((fs_, r1, r2, i, j))
-                        return N
-    return N
+def inter_swap_route_evals(cvrp, soln, r1, routes=None, fs=None, idx=None):
+    """Evaluate at once (vectorized) all inter-route swaps between route r1 (or only its indexes idx) and the routes
+    r2 > r1 (or the given routes), with the same evaluation (and float operation order) as Solution.inter_best_swap_eval. Returns arrays R2,
+    I, J and FS with the routes, indexes and cost of each swap (from fs, by default the solution cost; inf if it
+    violates the vehicle capacity), ordered by (i, r2, j)"""
+    D, route1 = cvrp.d_arr, np.asarray(soln.s[r1])
+    idx = np.arange(1, len(route1) - 1) if idx is None else np.asarray(idx, dtype=np.int64)
+    U = route1[idx]
+    routes = np.arange(r1 + 1, len(soln.s)) if routes is None else np.asarray(routes, dtype=np.int64)
+    L = np.array([len(soln.s[r2]) for r2 in routes], dtype=np.int64)
+    if not len(U) or not len(L) or L.max() < 3:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty, np.empty(0)
+    # routes r2 padded with the depot into a matrix A, only indexes 1 <= j <= len(r2) - 2 are valid
+    A = np.zeros((len(L), L.max()), dtype=np.int64)
+    for k in range(len(L)):
+        A[k, :L[k]] = soln.s[routes[k]]
+    valid = np.arange(1, L.max() - 1) < (L - 1)[:, None]
+    R2, J = np.nonzero(valid)
+    R2, J = routes[R2], J + 1
+    V = A[:, 1:-1][valid]
+    # capacity feasibility mask from the route loads and node demands
+    cap2 = np.asarray(soln.cap, dtype=np.float64)[R2]
+    dem_u, dem_v = cvrp.dem_arr[U][:, None], cvrp.dem_arr[V]
+    ok = (soln.cap[r1] - dem_u + dem_v <= cvrp.cap) & (cap2 - dem_v + dem_u <= cvrp.cap)
+    # removal of each node from its route
+    rem_u = - D[route1[idx - 1], U].astype(np.float64) - D[U, route1[idx + 1]] + D[route1[idx - 1], route1[idx + 1]]
+    rem_v = - D[A[:, :-2], A[:, 1:-1]].astype(np.float64) - D[A[:, 1:-1], A[:, 2:]] + D[A[:, :-2], A[:, 2:]]
+    # cheapest insertion of node i into r2 as if j were removed, edges j and j + 1 excluded
+    u = U[:, None, None]
+    C = D[A[None, :, :-1], u].astype(np.float64) + D[u, A[None, :, 1:]] - D[A[:, :-1], A[:, 1:]]
+    C[:, np.arange(L.max() - 1) >= (L - 1)[:, None]] = float("inf")
+    best_u = best_reinsertions(C, D[A[None, :, :-2], u].astype(np.float64) + D[u, A[None, :, 2:]]
+                               - D[A[:, :-2], A[:, 2:]])[:, valid]
+    # cheapest insertion of node j into r1 as if i were removed
+    v = V[:, None, None]
+    C = D[route1[None, None, :-1], v].astype(np.float64) + D[v, route1[None, None, 1:]] - D[route1[:-1], route1[1:]]
+    best_v = best_reinsertions(C, D[route1[None, None, :-2], v].astype(np.float64) + D[v, route1[None, None, 2:]]
+                               - D[route1[:-2], route1[2:]])[:, 0, idx - 1]
+    FS = rem_u[:, None] + rem_v[valid]
+    FS += best_u
+    FS += best_v.T
+    FS = np.float64(soln.fs if fs is None else fs) + FS
+    FS[~ok] = float("inf")
+    I = np.repeat(idx, len(V))
+    return np.tile(R2, len(U)), I, np.tile(J, len(U)), FS.ravel()
+
+
+def best_reinsertions(C, virtual):
+    """Given the insertion costs C[..., e - 1] of nodes between indexes e - 1 and e of routes, and the insertion costs
+    virtual[..., j - 1] in the edge left by removing index j, get the cheapest insertion as if index j were removed"""
+    # edges j and j + 1 touch the removed node: take the cheapest of the edges before (prefix) and after (suffix) them
+    inf = np.full(C.shape[:-1] + (1,), float("inf"))
+    before = np.concatenate((inf, np.minimum.accumulate(C, axis=-1)[..., :-2]), axis=-1)
+    after = np.concatenate((np.minimum.accumulate(C[..., ::-1], axis=-1)[..., ::-1][..., 2:], inf), axis=-1)
+    return np.minimum(virtual, np.minimum(before, after))
 
 
 def get_inter_best_swap_random_neighbor(cvrp, soln):
@@ -96,35 +181,297 @@ def get_inter_best_swap_random_neighbor(cvrp, soln):
     return N
 
 
+# ================================================ Don't look bits =====================================================
+class DontLookBits:
+    """Don't look bits of the customers for each neighborhood (k=1: 2-opt k=2: inter-route swap), with a resumable
+    scan cursor. Customers without improving moves are skipped until a move changes an edge next to them (reset)"""
+
+    def __init__(self, cvrp, max_k=MAX_K):
+        self.active = [[False] + [True] * (len(cvrp.d) - 1) for k in range(max_k)]  # the depot is never scanned
+        self.cursor = [1] * max_k
+
+    def reset(self, nodes):
+        """Activate the customers next to changed edges, in every neighborhood"""
+        for active in self.active:
+            for u in nodes:
+                if u:
+                    active[u] = True
+
+    def scan(self, cvrp, soln, k, get_node_neighbor):
+        """Get the first improving neighbor of an active customer, resuming from the cursor of neighborhood k (1-based).
+        Customers without improving neighbors are deactivated; an empty list means all of them are"""
+        active, n = self.active[k - 1], len(self.active[k - 1])
+        u, idle = self.cursor[k - 1], 0
+        while idle < n - 1:
+            if active[u]:
+                N = get_node_neighbor(cvrp, soln, u)
+                if N:
+                    self.cursor[k - 1] = u  # resume at u, that is reactivated by the move
+                    return N
+                active[u] = False
+            idle += 1
+            u = u % (n - 1) + 1
+        self.cursor[k - 1] = u
+        return []
+
+
+def get_two_opt_node_first_neighbor(cvrp, soln, u):
+    """Get first improving same route 2-opt neighbor removing an edge of customer u. A neighbor represented as:
+    [fs, r, i, j]"""
+    r, p = soln.locate(u)
+    route = soln.s[r]
+    if cvrp.neigh is None:
+        # u = route[i], u = route[i - 1], u = route[j] or u = route[j + 1]
+        n = len(route) - 1
+        I = np.concatenate((np.full(max(n - p - 1, 0), p), np.full(max(n - p - 2, 0), p + 1),
+                            np.arange(1, p), np.arange(1, p - 1)))
+        J = np.concatenate((np.arange(p + 1, n), np.arange(p + 2, n), np.full(p - 1, p), np.full(max(p - 2, 0), p - 1)))
+        order = np.lexsort((J, I))
+        I, J = I[order], J[order]
+    else:
+        pairs = [(i, j) for i, j in two_opt_pairs(cvrp, route) if i == p or i == p + 1 or j == p or j == p - 1]
+        I = np.array([i for i, j in pairs], dtype=np.int64)
+        J = np.array([j for i, j in pairs], dtype=np.int64)
+    a, D = np.asarray(route), cvrp.d_arr
+    FS = np.float64(soln.fs) + D[a[I - 1], a[J]] + D[a[I], a[J + 1]] - D[a[I - 1], a[I]] - D[a[J], a[J + 1]]
+    imp = np.flatnonzero(FS + EPS < soln.fs)
+    if len(imp):
+        k = imp[0]
+        return [(float(FS[k]), r, int(I[k]), int(J[k]))]
+    return []
+
+
+def get_inter_best_swap_node_first_neighbor(cvrp, soln, u):
+    """Get first improving inter-route swap neighbor of customer u. A neighbor represented as: [fs, r1, r2, i, j]"""
+    r, p = soln.locate(u)
+    if cvrp.neigh is None:
+        routes = [r2 for r2 in range(len(soln.s)) if r2 != r]
+        R2, I, J, FS = inter_swap_route_evals(cvrp, soln, r, routes, idx=[p])
+        imp = np.flatnonzero(FS + EPS < soln.fs)
+        if len(imp):
+            k = imp[0]
+            r2, q, fs_ = int(R2[k]), int(J[k]), float(FS[k])
+        else:
+            return []
+    else:
+        for v in cvrp.neigh[u]:
+            r2, q = soln.locate(v)
+            if v and r2 != r:
+                fs_ = soln.inter_best_swap_eval(cvrp, r, r2, p, q)
+                if fs_ + EPS < soln.fs:
+                    break
+        else:
+            return []
+    # routes ordered as in the inter-route swap neighborhood (r1 < r2)
+    return [(fs_, r, r2, p, q)] if r < r2 else [(fs_, r2, r, q, p)]
+
+
+# ================================================ Move evaluation cache ===============================================
+class DirtyRoutes:
+    """Base of the move caches: evaluation of the inter-route swaps touching the dirty routes (changed by the applied
+    moves). The cheapest insertions used by granular swaps are kept for the other routes"""
+
+    def __init__(self):
+        self.ins = None  # cheapest insertions (granular swaps), dropped for the dirty routes
+
+    def mark(self, *routes):
+        """Mark routes changed by a move as dirty"""
+        if self.ins is not None:
+            for r in routes:
+                self.ins[r] = None
+
+    def swap_evals(self, cvrp, soln, dirty):
+        """Evaluate the inter-route swaps touching the (sorted) dirty routes: arrays R1, R2, I, J and DS of the route
+        pairs (r1 < r2, i indexing r1) and cost variations. Swaps between the same routes are consecutive, in the order
+        of inter_swap_route_evals or of the granular candidates (inter_swap_quads)"""
+        if cvrp.neigh is None:
+            R1, R2, I, J, DS = [], [], [], [], []
+            # each dirty route against all routes (but the dirty routes already evaluated)
+            for idx in range(len(dirty)):
+                r = dirty[idx]
+                routes = [r2 for r2 in range(len(soln.s)) if r2 != r and r2 not in dirty[:idx]]
+                R2_, I_, J_, DS_ = inter_swap_route_evals(cvrp, soln, r, routes, 0.0)
+                lower = r < R2_
+                R1.append(np.where(lower, r, R2_))
+                R2.append(np.where(lower, R2_, r))
+                I.append(np.where(lower, I_, J_))
+                J.append(np.where(lower, J_, I_))
+                DS.append(DS_)
+            return tuple(np.concatenate(X) for X in (R1, R2, I, J, DS))
+        if self.ins is None:
+            self.ins = soln.best_insertions()
+        quads = inter_swap_quads(cvrp, soln, set(dirty))
+        R1, R2, I, J = (np.array([q[k] for q in quads], dtype=np.int64) for k in range(4))
+        DS = np.array([soln.inter_best_swap_eval(cvrp, *q, self.ins) - soln.fs for q in quads], dtype=np.float64)
+        return R1, R2, I, J, DS
+
+
+class MoveCache(DirtyRoutes):
+    """Cache of the best move (as a cost variation) of each route for the same route 2-opt neighborhood and of each
+    route pair (r1 < r2) for the inter-route swap neighborhood. Applied moves mark the changed routes as dirty, and only
+    the dirty routes (and route pairs touching them) are evaluated again"""
+
+    def __init__(self, soln):
+        super().__init__()
+        n = len(soln.s)
+        self.two_opt = np.full(n, float("inf"))  # best 2-opt variation of each route
+        self.two_opt_ij = np.zeros((n, 2), dtype=np.int64)
+        self.swap = np.full((n, n), float("inf"))  # best swap variation of each route pair (upper triangle)
+        self.swap_ij = np.zeros((n, n, 2), dtype=np.int64)
+        self.two_opt_dirty = set(range(n))
+        self.swap_dirty = set(range(n))
+
+    def mark(self, *routes):
+        """Mark routes changed by a move as dirty"""
+        super().mark(*routes)
+        self.two_opt_dirty.update(routes)
+        self.swap_dirty.update(routes)
+
+    def get_two_opt_best_neighbor(self, cvrp, soln):
+        """Get best improvement neighbor regarding same route 2-opt neighborhood. A neighbor represented as:
+        [fs, r, i, j]"""
+        if self.two_opt_dirty:
+            routes = sorted(self.two_opt_dirty)
+            self.two_opt_dirty.clear()
+            self.two_opt[routes] = float("inf")
+            R, I, J, DS = two_opt_evals(cvrp, soln, routes, 0.0)
+            for k in first_min_per_key(R, DS):
+                self.two_opt[R[k]] = DS[k]
+                self.two_opt_ij[R[k]] = I[k], J[k]
+        r = int(np.argmin(self.two_opt))
+        fs_ = soln.fs + float(self.two_opt[r])
+        if fs_ + EPS < soln.fs:
+            return [(fs_, r, int(self.two_opt_ij[r, 0]), int(self.two_opt_ij[r, 1]))]
+        return []
+
+    def get_inter_best_swap_best_neighbor(self, cvrp, soln):
+        """Get best improvement neighbor regarding inter-route swap neighborhood. A neighbor represented as:
+        [fs, r1, r2, i, j]"""
+        if self.swap_dirty:
+            dirty = sorted(self.swap_dirty)
+            self.swap_dirty.clear()
+            self.swap[dirty, :] = float("inf")
+            self.swap[:, dirty] = float("inf")
+            R1, R2, I, J, DS = self.swap_evals(cvrp, soln, dirty)
+            for k in first_min_per_key(R1 * len(soln.s) + R2, DS):
+                self.swap[R1[k], R2[k]] = DS[k]
+                self.swap_ij[R1[k], R2[k]] = I[k], J[k]
+        r1, r2 = np.unravel_index(np.argmin(self.swap), self.swap.shape)
+        fs_ = soln.fs + float(self.swap[r1, r2])
+        if fs_ + EPS < soln.fs:
+            return [(fs_, int(r1), int(r2), int(self.swap_ij[r1, r2, 0]), int(self.swap_ij[r1, r2, 1]))]
+        return []
+
+
+class MoveQueue(DirtyRoutes):
+    """All moves of the same route 2-opt neighborhood, by route, and of the inter-route swap neighborhood, by route pair
+    (r1 < r2), as cost variations in increasing order (ties by indexes). Applied moves mark the changed routes as
+    dirty, and only the dirty routes (and route pairs touching them) are evaluated again"""
+
+    def __init__(self, soln):
+        super().__init__()
+        self.two_opt = {}  # sorted arrays DS, I and J of the moves of each route r
+        self.swap = {}  # sorted arrays DS, I and J of the moves of each route pair (r1, r2)
+        self.dirty = set(range(len(soln.s)))
+
+    def mark(self, *routes):
+        """Mark routes changed by a move as dirty"""
+        super().mark(*routes)
+        self.dirty.update(routes)
+
+    def update(self, cvrp, soln):
+        """Evaluate the moves of the dirty routes and route pairs again"""
+        if not self.dirty:
+            return
+        dirty, n = sorted(self.dirty), len(soln.s)
+        self.dirty.clear()
+        R, I, J, DS = two_opt_evals(cvrp, soln, dirty, 0.0)
+        for r in dirty:
+            self.two_opt.pop(r, None)
+        for r, moves in sorted_groups(R, DS, I, J):
+            self.two_opt[r] = moves
+        dirty_set = set(dirty)
+        for key in [key for key in self.swap if key[0] in dirty_set or key[1] in dirty_set]:
+            del self.swap[key]
+        R1, R2, I, J, DS = self.swap_evals(cvrp, soln, dirty)
+        ok = DS < float("inf")  # capacity feasible
+        for key, moves in sorted_groups(R1[ok] * n + R2[ok], DS[ok], I[ok], J[ok]):
+            self.swap[divmod(key, n)] = moves
+
+    def best_neighbor(self, cvrp, soln, admissible):
+        """Get the least cost neighbor N for which admissible(N) holds, as [fs, r, i, j] (2-opt) or [fs, r1, r2, i, j]
+        (inter-route swap), or None. Ties go to 2-opt and then to the least indexes. Lists are scanned in order of
+        their least cost, each one only up to its first admissible move"""
+        self.update(cvrp, soln)
+        lists = [(r, None, moves) for r, moves in self.two_opt.items()] \
+                + [(r1, r2, moves) for (r1, r2), moves in self.swap.items()]
+        heads = np.array([moves[0][0] for r1, r2, moves in lists])
+        best, N_best = (float("inf"),), None
+        for k in np.argsort(heads, kind="stable"):
+            r1, r2, (DS, I, J) = lists[k]
+            if DS[0] > best[0]:
+                break
+            for e in range(len(DS)):
+                if DS[e] > best[0]:
+                    break
+                i, j = int(I[e]), int(J[e])
+                N = [soln.fs + float(DS[e]), r1, i, j] if r2 is None else [soln.fs + float(DS[e]), r1, r2, i, j]
+                if admissible(N):
+                    key = (DS[e], 0, r1, i, j) if r2 is None else (DS[e], 1, r1, i, r2, j)
+                    if key < best:
+                        best, N_best = key, N
+                    break
+        return N_best
+
+
+def sorted_groups(K, DS, I, J):
+    """Split the moves with keys K, cost variations DS and indexes I and J by key, each group sorted by (DS, I, J).
+    Yields (key, (DS, I, J)) in increasing key order"""
+    if not len(K):
+        return
+    order = np.lexsort((J, I, DS, K))
+    K, DS, I, J = K[order], DS[order], I[order], J[order]
+    bounds = np.flatnonzero(np.concatenate(([True], K[1:] != K[:-1], [True])))
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        yield int(K[a]), (DS[a:b], I[a:b], J[a:b])
+
+
+def first_min_per_key(K, V):
+    """Get the index of the first minimum value of V for each distinct key of K"""
+    if not len(K):
+        return []
+    order = np.lexsort((V, K))  # stable: ties keep their original order
+    K = K[order]
+    return order[np.flatnonzero(np.concatenate(([True], K[1:] != K[:-1])))].tolist()
+
+
 # ================================================ Local search methods ================================================
-def descent_two_opt(cvrp, soln):
+def descent_two_opt(cvrp, soln, cache=None):
     """Descent local search method (same route 2-opt) for CVRP"""
     t_init = time.time()
-    N = get_two_opt_neighbors(cvrp, soln)
+    cache = MoveCache(soln) if cache is None else cache
+    N = cache.get_two_opt_best_neighbor(cvrp, soln)
     while N:
-        # select best neighbor
-        best_n = -1
-        min = float("inf")
-        for n in N:
-            if n[0] < min:
-                min = n[0]
-                best_n = n
-        # move to next neighbor
-        soln.two_opt_move(cvrp, best_n[1], best_n[2], best_n[3])
+        # move to best neighbor
+        soln.two_opt_move(cvrp, N[0][1], N[0][2], N[0][3])
+        cache.mark(N[0][1])
         # print(round(soln.fs, 2))
-        N = get_two_opt_neighbors(cvrp, soln)
+        N = cache.get_two_opt_best_neighbor(cvrp, soln)
     return soln, time.time() - t_init
 
 
-def first_improvement_two_opt(cvrp, soln):
+def first_improvement_two_opt(cvrp, soln, bits=None):
     """First improvement local search method (same route 2-opt) for CVRP"""
     t_init = time.time()
-    N = get_two_opt_first_neighbor(cvrp, soln)
+    bits = DontLookBits(cvrp) if bits is None else bits
+    N = bits.scan(cvrp, soln, 1, get_two_opt_node_first_neighbor)
     while N:
-        # move to next neighbor
-        soln.two_opt_move(cvrp, N[0][1], N[0][2], N[0][3])
+        # move to next neighbor, activating the customers of the removed edges
+        route, i, j = soln.s[N[0][1]], N[0][2], N[0][3]
+        bits.reset((route[i - 1], route[i], route[j], route[j + 1]))
+        soln.two_opt_move(cvrp, N[0][1], i, j)
         # print(round(soln.fs, 2))
-        N = get_two_opt_first_neighbor(cvrp, soln)
+        N = bits.scan(cvrp, soln, 1, get_two_opt_node_first_neighbor)
     return soln, time.time() - t_init
 
 
@@ -154,34 +501,36 @@ def random_descent_two_opt(cvrp, soln, max_it):
     return soln, time.time() - t_init
 
 
-def descent_inter_best_swap(cvrp, soln):
+def descent_inter_best_swap(cvrp, soln, cache=None):
     """Descent local search method (inter-route swap) for CVRP"""
     t_init = time.time()
-    N = get_inter_best_swap_neighbors(cvrp, soln)
+    cache = MoveCache(soln) if cache is None else cache
+    N = cache.get_inter_best_swap_best_neighbor(cvrp, soln)
     while N:
-        # select best neighbor
-        best_n = -1
-        min = float("inf")
-        for n in N:
-            if n[0] < min:
-                min = n[0]
-                best_n = n
-        # move to next neighbor
-        soln.inter_best_swap_move(cvrp, best_n[1], best_n[2], best_n[3], best_n[4])
+        # move to best neighbor
+        soln.inter_best_swap_move(cvrp, N[0][1], N[0][2], N[0][3], N[0][4])
+        cache.mark(N[0][1], N[0][2])
         # print(round(soln.fs, 2))
-        N = get_inter_best_swap_neighbors(cvrp, soln)
+        N = cache.get_inter_best_swap_best_neighbor(cvrp, soln)
     return soln, time.time() - t_init
 
 
-def first_improvement_inter_best_swap(cvrp, soln):
+def first_improvement_inter_best_swap(cvrp, soln, bits=None):
     """First improvement local search method (inter-route swap) for CVRP"""
     t_init = time.time()
-    N = get_inter_best_swap_first_neighbor(cvrp, soln)
+    bits = DontLookBits(cvrp) if bits is None else bits
+    N = bits.scan(cvrp, soln, 2, get_inter_best_swap_node_first_neighbor)
     while N:
-        # move to next neighbor
-        soln.inter_best_swap_move(cvrp, N[0][1], N[0][2], N[0][3], N[0][4])
+        # move to next neighbor, activating the customers of the removed and inserted edges
+        route1, route2, i, j = soln.s[N[0][1]], soln.s[N[0][2]], N[0][3], N[0][4]
+        nodes = [route1[i - 1], route1[i], route1[i + 1], route2[j - 1], route2[j], route2[j + 1]]
+        soln.inter_best_swap_move(cvrp, N[0][1], N[0][2], i, j)
+        for u in (nodes[1], nodes[4]):
+            r, p = soln.locate(u)
+            nodes += [soln.s[r][p - 1], soln.s[r][p + 1]]
+        bits.reset(nodes)
         # print(round(soln.fs, 2))
-        N = get_inter_best_swap_first_neighbor(cvrp, soln)
+        N = bits.scan(cvrp, soln, 2, get_inter_best_swap_node_first_neighbor)
     return soln, time.time() - t_init
 
 
@@ -233,14 +582,15 @@ def random_descent(cvrp, soln, max_it):
 def vnd(cvrp, soln, max_k):
     """Variable neighborhood descent method for TSP (k=1: 2-opt k=2: inter-route swap)"""
     t_init = time.time()
+    cache = MoveCache(soln)  # shared by both neighborhoods: each one only evaluates the routes the other changed
     k = 1
     while k <= max_k:
+        fs = soln.fs  # descents work in place: compare with the cost before them
         if k == 1:
-            soln_, t = descent_two_opt(cvrp, soln)
+            soln, t = descent_two_opt(cvrp, soln, cache)
         elif k == 2:
-            soln_, t = descent_inter_best_swap(cvrp, soln)
-        if soln_.fs < soln.fs:
-            soln_ = soln.copy()
+            soln, t = descent_inter_best_swap(cvrp, soln, cache)
+        if soln.fs + EPS < fs:
             k = 1
         else:
             k += 1
@@ -250,14 +600,15 @@ def vnd(cvrp, soln, max_k):
 def vnd_first_improvement(cvrp, soln, max_k):
     """Variable neighborhood descent (using first improvement) method for TSP (k=1: 2-opt k=2: inter-route swap)"""
     t_init = time.time()
+    bits = DontLookBits(cvrp)  # shared by both neighborhoods: moves of one reactivate customers in the other
     k = 1
     while k <= max_k:
+        fs = soln.fs  # descents work in place: compare with the cost before them
         if k == 1:
-            soln_, t = first_improvement_two_opt(cvrp, soln)
+            soln, t = first_improvement_two_opt(cvrp, soln, bits)
         elif k == 2:
-            soln_, t = first_improvement_inter_best_swap(cvrp, soln)
-        if soln_.fs < soln.fs:
-            soln_ = soln.copy()
+            soln, t = first_improvement_inter_best_swap(cvrp, soln, bits)
+        if soln.fs + EPS < fs:
             k = 1
         else:
             k += 1
@@ -285,7 +636,7 @@ def local_search(cvrp, soln, params):
     if params.local_search == "DESCENT2OPT":
         soln, t = descent_two_opt(cvrp, soln)
     elif params.local_search == "DESCENTINTER":
-        soln, t = random_descent_inter_best_swap(cvrp, soln)
+        soln, t = descent_inter_best_swap(cvrp, soln)
     elif params.local_search == "FIRSTIMP2OPT":
         soln, t = first_improvement_two_opt(cvrp, soln)
     elif params.local_search == "FIRSTIMPINTER":
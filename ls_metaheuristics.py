@@ -2,67 +2,143 @@ import local_search as ls
 import time
 import random
 import math
+import numpy as np
+
+
+SA_BLOCK = 65536  # trial moves per block of pre-drawn random numbers
+SA_T_MIN = 0.001  # final (cold) temperature
 
 
 def simulated_annealing(cvrp, soln, params):
-    """Simulated Annealing https://www.science.org/doi/10.1126/science.220.4598.671"""
+    """Simulated Annealing https://www.science.org/doi/10.1126/science.220.4598.671. The initial temperature is
+    params.sa_t_0 or calibrated (params.sa_calibration). The GEOMETRIC schedule (params.sa_schedule) cools by
+    params.sa_alpha at each level and restarts from the best solution once cold, the TIME one derives the cooling of each
+    level from the time left and the measured trials/sec so that the run ends cold at the time limit. After
+    params.sa_reheat levels without improving the best solution (0 = never), the temperature goes back to the one of
+    the last improvement (to half of it on the next reheating without improvement, and so on)"""
     t_init = time.time()
     chart_data = []
     soln_star = soln.copy()
+    rng = np.random.default_rng(random.getrandbits(64))  # seeded from the main stream, for reproducibility
+    t_0 = initial_temperature(cvrp, soln, params)
+    n_trials = params.sa_max * len(cvrp.d)  # trials per temperature level
+    trials, t_trials = 0, 0.0  # trials done and time spent on them
     while time.time() - t_init < params.time_limit:
-        iter_t = 0    # iterations at temperature t
-        t = params.sa_t_0       # current temperature
-        soln = soln_star.copy()
-        while t > 0.001:
+        t = t_0       # current temperature
+        t_best, stall = t, 0  # temperature of the last improvement of the best solution, levels since then
+        soln = soln_star.copy_into(soln)
+        while (t > SA_T_MIN or params.sa_schedule == "TIME") and time.time() - t_init < params.time_limit:
             if params.verbose:
-                print(f'| temp: {t:10.3f}  |  s: {soln.fs:10.3f}  |  s*: {soln_star.fs:10.3f}  |  time: {time.time() - t_init:10.2f} |')
-            while iter_t < params.sa_max * len(cvrp.d):
-                iter_t += 1
-                N = ls.get_random_neighbor(cvrp, soln)
-                delta = N[0][0] - soln.fs
-                if delta < 0:
-                    soln.move_to_neighbor(N[0], cvrp)
-                    if soln.fs < soln_star.fs:
-                        soln_star = soln.copy()
-                else:
-                    x = random.random()  # generates a random float number between 0 and 1
-                    if x < math.exp(-delta/t):  # move to a worsening neighbor
-                        soln.move_to_neighbor(N[0], cvrp)
+                print(f'| temp: {t:10.3f}  |  s: {soln.fs:10.3f}  |  s*: {soln_star.fs:10.3f}  |  time: {time.time() - t_init:10.2f} |  trials/s: {trials / max(t_trials, 1e-9):10.0f} |')
+            fs_star, t_level = soln_star.fs, time.time()
+            m = n_trials
+            if params.sa_schedule == "TIME" and trials:  # the last level fits the time left
+                m = max(1, min(n_trials, int((params.time_limit - (t_level - t_init)) * trials / t_trials)))
+            sa_level(cvrp, soln, soln_star, t, m, rng)
+            trials, t_trials = trials + m, t_trials + time.time() - t_level
             chart_data.append([time.time() - t_init, soln.fs, soln_star.fs])
-            t = params.sa_alpha * t
-            iter_t = 0
+            if soln_star.fs < fs_star:
+                t_best, stall = t, 0
+            else:
+                stall += 1
+            if params.sa_reheat and stall >= params.sa_reheat:  # reheating (halving the next one, unless it improves)
+                t, t_best, stall = t_best, t_best / 2, 0
+                if params.verbose:
+                    print(f'| reheat: {t:10.3f} |')
+            elif params.sa_schedule == "TIME":
+                levels = (params.time_limit - (time.time() - t_init)) * trials / t_trials / n_trials
+                t = max(t * (SA_T_MIN / t) ** (1 / max(levels, 1)), SA_T_MIN)  # then cold until the time limit
+            else:
+                t = params.sa_alpha * t
     return soln_star, time.time() - t_init, chart_data
 
 
-def set_initial_temperature_simulation(d, s, fs, sa_max, t_0=100, beta=1.15, gama=0.90):
-    """Defines initial temperature by simulation"""
+def sa_level(cvrp, soln, soln_star, t, n_trials, rng):
+    """Run n_trials random trial moves (2-opt or inter-route swap, 50% odds each) of Simulated Annealing at temperature
+    t, updating soln_star. Random numbers are drawn in NumPy blocks and a move is accepted if its cost variation is
+    below the threshold -t * log(u), equivalent to u < exp(-delta / t). Trials that pick no valid move (a route
+    without two customers, equal indexes or routes) are rejected. Returns the number of accepted moves"""
+    d, s, accepted = cvrp.d, soln.s, 0
+    for block in range(0, n_trials, SA_BLOCK):
+        m = min(SA_BLOCK, n_trials - block)
+        kind = (rng.random(m) < 0.5).tolist()
+        U = rng.random((m, 4)).tolist()
+        thr = (-t * np.log1p(-rng.random(m))).tolist()  # log(1 - x): u in (0, 1]
+        for k in range(m):
+            u = U[k]
+            if kind[k]:  # 2-opt
+                r = int(u[0] * len(s))
+                route = s[r]
+                n = len(route) - 2
+                i, j = 1 + int(u[1] * n), 1 + int(u[2] * n)
+                if i == j:
+                    continue
+                if i > j:
+                    i, j = j, i
+                delta = d[route[i - 1]][route[j]] + d[route[i]][route[j + 1]] \
+                    - d[route[i - 1]][route[i]] - d[route[j]][route[j + 1]]
+                if delta < thr[k]:
+                    soln.two_opt_move(cvrp, r, i, j)
+                    accepted += 1
+            else:  # inter-route swap
+                r1, r2 = int(u[0] * len(s)), int(u[1] * len(s))
+                if r1 == r2 or len(s[r1]) < 3 or len(s[r2]) < 3:
+                    continue
+                if r1 > r2:
+                    r1, r2 = r2, r1
+                i, j = 1 + int(u[2] * (len(s[r1]) - 2)), 1 + int(u[3] * (len(s[r2]) - 2))
+                delta = soln.inter_best_swap_eval(cvrp, r1, r2, i, j) - soln.fs
+                if delta < thr[k]:
+                    soln.inter_best_swap_move(cvrp, r1, r2, i, j)
+                    accepted += 1
+            if delta < 0 and soln.fs < soln_star.fs:
+                soln.copy_into(soln_star)
+    return accepted
+
+
+def initial_temperature(cvrp, soln, params):
+    """Initial temperature of SA: params.sa_t_0, or calibrated by simulation or sampling (params.sa_calibration)"""
+    if params.sa_calibration == "SIMULATION":
+        return set_initial_temperature_simulation(cvrp, soln, len(cvrp.d))
+    elif params.sa_calibration == "SAMPLING":
+        return set_initial_temperature_sampling(cvrp, soln, len(cvrp.d))
+    return params.sa_t_0
+
+
+def set_initial_temperature_simulation(cvrp, soln, sa_max, t_0=100, beta=1.15, gama=0.90):
+    """Defines initial temperature by simulation: raise it until a gama ratio of sa_max random neighbors is accepted
+    (infeasible neighbors, that are never accepted, are not counted)"""
     t = t_0       # current temperature
     flag = True
     while flag:
         accepted = 0
+        feasible = 0
         for iter_t in range(sa_max):
-            N = ls.get_random_neighbor(d, fs, s)
-            delta = N[0][0] - fs
+            N = ls.get_random_neighbor(cvrp, soln)
+            delta = N[0][0] - soln.fs
+            if math.isinf(delta):
+                continue
+            feasible += 1
             if delta < 0:
                 accepted += 1
             else:
                 x = random.random()
                 if x < math.exp(-delta/t):
                     accepted += 1
-        if accepted >= gama * sa_max:
+        if accepted >= gama * feasible:
             flag = False
         else:
             t = beta * t
     return t
 
 
-def set_initial_temperature_sampling(d, s, fs, n_neighbors=100):
-    """Defines initial temperature by sampling"""
+def set_initial_temperature_sampling(cvrp, soln, n_neighbors=100):
+    """Defines initial temperature by sampling: the largest cost variation of n_neighbors random (feasible) neighbors"""
     t = 0
     for i in range(n_neighbors):
-        N = ls.get_random_neighbor(d, fs, s)
-        delta = fs - N[0][0]
-        if math.fabs(delta) > t:
+        N = ls.get_random_neighbor(cvrp, soln)
+        delta = soln.fs - N[0][0]
+        if math.fabs(delta) > t and not math.isinf(delta):
             t = math.fabs(delta)
     return t
 
@@ -75,22 +151,28 @@ def ils(cvrp, soln, params):
     soln, t = ls.local_search(cvrp, soln, params)
     chart_data.append([time.time() - t_init, soln.fs, soln.fs])
     it = 0
+    soln.start_log()  # candidates are built in place and rolled back if rejected (no solution copies)
     while time.time() - t_init < params.time_limit:
         it += 1
-        soln_ = soln.copy()
+        fs = soln.fs
         # perturbation
-        for _ in range(params.ils_p_level):  # perturbation: apply p_level inter-route best swap random moves to s_
-            N = ls.get_inter_best_swap_random_neighbor(cvrp, soln_)
-            soln_.inter_best_swap_move(cvrp, N[0][1], N[0][2], N[0][3], N[0][4])
-        chart_data.append([time.time() - t_init, soln_.fs, soln.fs])
+        for _ in range(params.ils_p_level):  # perturbation: apply p_level inter-route best swap random moves to s
+            N = ls.get_inter_best_swap_random_neighbor(cvrp, soln)
+            soln.inter_best_swap_move(cvrp, N[0][1], N[0][2], N[0][3], N[0][4])
+        fs_ = soln.fs
+        chart_data.append([time.time() - t_init, fs_, fs])
         # local search
-        soln__, t = ls.local_search(cvrp, soln_, params)
+        soln, t = ls.local_search(cvrp, soln, params)
+        fs__ = soln.fs
         # acceptance condition
-        if soln__.fs < soln.fs:
-            soln = soln__.copy()
+        if fs__ < fs:
+            soln.commit()
+        else:
+            soln.rollback()
         if params.verbose:
-            print(f'| it: {it:6d}  |  s_: {soln_.fs:10.2f}  |  s__: {soln__.fs:10.2f}  |  s*: {soln.fs:10.2f}  |  time: {time.time() - t_init:10.2f} |')
-        chart_data.append([time.time() - t_init, soln__.fs, soln.fs])
+            print(f'| it: {it:6d}  |  s_: {fs_:10.2f}  |  s__: {fs__:10.2f}  |  s*: {soln.fs:10.2f}  |  time: {time.time() - t_init:10.2f} |')
+        chart_data.append([time.time() - t_init, fs__, soln.fs])
+    soln.log = None
     return soln, time.time() - t_init, chart_data
 
 
@@ -99,87 +181,113 @@ def vns(cvrp, soln, params):
     t_init = time.time()
     chart_data = []
     it = 0
+    soln.start_log()  # candidates are built in place and rolled back if rejected (no solution copies)
     while time.time() - t_init < params.time_limit:
         it += 1
         k = 1
         while k <= params.vns_k_max:
-            soln_ = soln.copy()
+            fs = soln.fs
             if k == 1:  # move to random 2-opt neighbor
-                for _ in range(params.vns_p_level):  # perturbation: apply p_level 2-opt random moves to s_
+                for _ in range(params.vns_p_level):  # perturbation: apply p_level 2-opt random moves to s
                     N = ls.get_two_opt_random_neighbor(cvrp, soln)
-                    soln_.two_opt_move(cvrp, N[0][1], N[0][2], N[0][3])
+                    soln.two_opt_move(cvrp, N[0][1], N[0][2], N[0][3])
             elif k == 2:  # move to random inter-route best swap neighbor
-                for _ in range(params.vns_p_level):  # perturbation: apply p_level inter-route swap random moves to s_
+                for _ in range(params.vns_p_level):  # perturbation: apply p_level inter-route swap random moves to s
                     N = ls.get_inter_best_swap_random_neighbor(cvrp, soln)
-                    soln_.inter_best_swap_move(cvrp, N[0][1], N[0][2], N[0][3], N[0][4])
-            chart_data.append([time.time() - t_init, soln_.fs, soln.fs])
+                    soln.inter_best_swap_move(cvrp, N[0][1], N[0][2], N[0][3], N[0][4])
+            fs_ = soln.fs
+            chart_data.append([time.time() - t_init, fs_, fs])
             # local search
-            soln__, t = ls.local_search(cvrp, soln_, params)
-            if soln__.fs + ls.EPS < soln.fs:
-                soln = soln__.copy()
+            soln, t = ls.local_search(cvrp, soln, params)
+            fs__ = soln.fs
+            if fs__ + ls.EPS < fs:
+                soln.commit()
                 k = 1
             else:
+                soln.rollback()
                 k = k + 1
             if params.verbose:
-                print(f'| it: {it:6d}  |  k: {k:3d}  |  s_: {soln_.fs:10.2f}  |  s__: {soln__.fs:10.2f}  |  s*: {soln.fs:10.2f}  |  time: {time.time() - t_init:10.2f} |')
-            chart_data.append([time.time() - t_init, soln__.fs, soln.fs])
+                print(f'| it: {it:6d}  |  k: {k:3d}  |  s_: {fs_:10.2f}  |  s__: {fs__:10.2f}  |  s*: {soln.fs:10.2f}  |  time: {time.time() - t_init:10.2f} |')
+            chart_data.append([time.time() - t_init, fs__, soln.fs])
+    soln.log = None
     return soln, time.time() - t_init, chart_data
 
 
+class TabuMemory:
+    """Tabu memory of move attributes, as dicts of expiry iterations with O(1) checks. A 2-opt move makes its removed
+    arcs tabu (they cannot be added back) and a swap makes the routes left by its customers tabu for them (they cannot
+    move back), for tenure iterations"""
+
+    def __init__(self, tenure):
+        self.tenure = tenure
+        self.it = 0  # current iteration, attributes are tabu while their expiry is greater
+        self.arc = {}  # expiry of each (removed) arc (a, b), a < b
+        self.route = {}  # expiry of each (left) customer-route pair
+
+    def two_opt_tabu(self, soln, r, i, j):
+        """Check if 2-opt move (r, i, j) is tabu: it adds back an arc (route[i - 1], route[j]) or (route[i],
+        route[j + 1])"""
+        route = soln.s[r]
+        for a, b in ((route[i - 1], route[j]), (route[i], route[j + 1])):
+            if self.arc.get((a, b) if a < b else (b, a), 0) > self.it:
+                return True
+        return False
+
+    def swap_tabu(self, soln, r1, r2, i, j):
+        """Check if inter-route swap (r1, r2, i, j) is tabu: it moves a customer back into a route it left"""
+        return self.route.get((soln.s[r1][i], r2), 0) > self.it or self.route.get((soln.s[r2][j], r1), 0) > self.it
+
+    def add_two_opt(self, soln, r, i, j):
+        """Make tabu the arcs removed by 2-opt move (r, i, j), before doing it"""
+        route, expiry = soln.s[r], self.it + self.tenure
+        for a, b in ((route[i - 1], route[i]), (route[j], route[j + 1])):
+            self.arc[(a, b) if a < b else (b, a)] = expiry
+
+    def add_swap(self, soln, r1, r2, i, j):
+        """Make tabu the routes left by the customers of inter-route swap (r1, r2, i, j), before doing it"""
+        expiry = self.it + self.tenure
+        self.route[soln.s[r1][i], r1] = self.route[soln.s[r2][j], r2] = expiry
+
+
 def tabu_search(cvrp, soln, params):
     """Tabu Search https://link.springer.com/chapter/10.1007/978-1-4613-0303-9_33"""
     t_init = time.time()
     chart_data = []
     soln_star = soln.copy()
-    T = []  # tabu list
+    T = TabuMemory(params.tabu_max)  # tabu attributes
+    Q = ls.MoveQueue(soln)  # moves, evaluated again only for the changed routes
     it = 0
     while time.time() - t_init < params.time_limit:
         it += 1
-        soln, m = tabu_neighbor(cvrp, soln, soln_star.fs, T)
-        T.append(m)
-        if len(T) > params.tabu_max:
-            T.pop(0)
+        T.it = it
+        soln = tabu_neighbor(cvrp, soln, soln_star.fs, T, Q)
         if soln.fs < soln_star.fs:
-            soln_star = soln.copy()
+            soln.copy_into(soln_star)
         if params.verbose:
             print(f'| it: {it:6d}  |  s: {soln.fs:10.2f}  |  s*: {soln_star.fs:10.2f}  |  time: {time.time() - t_init:10.2f} |')
         chart_data.append([time.time() - t_init, soln.fs, soln_star.fs])
     return soln_star, time.time() - t_init, chart_data
 
 
-def tabu_neighbor(cvrp, soln, fs_star, T):
-    """Move to the best non Tabu neighbor"""
-    V = []
-    best_fs = float("inf")
-    # 2-opt neighbors
-    for r in range(len(soln.s)):
-        for i in range(1, len(soln.s[r]) - 1):
-            for j in range(i + 1, len(soln.s[r]) - 1):
-                m = (r, i, j)
-                fs_ = soln.two_opt_eval(cvrp, r, i, j)
-                if fs_ < best_fs and (m not in T or fs_ < fs_star):
-                    best_fs = fs_
-                    V.append([fs_, r, i, j])
-    # inter-route best swap neighbors
-    for r1 in range(len(soln.s)):
-        for i in range(1, len(soln.s[r1]) - 1):
-            for r2 in range(r1 + 1, len(soln.s)):
-                for j in range(1, len(soln.s[r2]) - 1):
-                    m = (r1, r2, i, j)
-                    fs_ = soln.inter_best_swap_eval(cvrp, r1, r2, i, j)
-                    if fs_ < best_fs and (m not in T or fs_ < fs_star):
-                        best_fs = fs_
-                        V.append([fs_, r1, r2, i, j])
-    if V:
-        if len(V[-1]) == 4:  # move to 2-opt best neighbor
-            r, i, j = V[-1][1], V[-1][2], V[-1][3]
-            m = (r, i, j)
+def tabu_neighbor(cvrp, soln, fs_star, T, Q=None):
+    """Move to the best non Tabu neighbor (tabu moves are discarded unless they improve the best solution), recording
+    the attributes of the move in the tabu memory T. The moves come from the queue Q (a new one by default), that is
+    marked with the changed routes"""
+    Q = ls.MoveQueue(soln) if Q is None else Q
+    N = Q.best_neighbor(cvrp, soln, lambda N: N[0] < fs_star or not (
+        T.two_opt_tabu(soln, *N[1:]) if len(N) == 4 else T.swap_tabu(soln, *N[1:])))
+    if N is not None:
+        if len(N) == 4:  # move to 2-opt best neighbor
+            r, i, j = N[1], N[2], N[3]
+            T.add_two_opt(soln, r, i, j)
             soln.two_opt_move(cvrp, r, i, j)
-        elif len(V[-1]) == 5:  # move to inter-route best swap best neighbor
-            r1, r2, i, j = V[-1][1], V[-1][2], V[-1][3], V[-1][4]
-            m = (r1, r2, i, j)
+            Q.mark(r)
+        elif len(N) == 5:  # move to inter-route best swap best neighbor
+            r1, r2, i, j = N[1], N[2], N[3], N[4]
+            T.add_swap(soln, r1, r2, i, j)
             soln.inter_best_swap_move(cvrp, r1, r2, i, j)
-    return soln, m
+            Q.mark(r1, r2)
+    return soln
 
 
 def grasp(cvrp, soln, params):
@@ -200,7 +308,7 @@ def grasp(cvrp, soln, params):
             print(f'| it: {it:6d}  |  s_ini: {soln_.fs:10.2f}  |  s: {soln__.fs:10.2f}  |  s*: {soln_star.fs:10.2f}  |  time: {time.time() - t_init:10.2f} |')
         if soln__.fs < soln_star.fs:
             fs_star = soln__.fs
-            soln_star = soln__.copy()
+            soln__.copy_into(soln_star)
         chart_data.append([time.time() - t_init, soln__.fs, soln_star.fs])
 
     return soln_star, time.time() - t_init, chart_data
@@ -6,13 +6,16 @@ import pop_metaheuristics
 import model as m
 import sys
 import local_search as ls
+import parallel
 from params import Params
 
 
 def main(args):
     params = Params(args)         # read command line parameters
-    d, dem, cap, coord = util.read_cvrp(params.instance)
+    d, dem, cap, coord = util.read_cvrp(params.instance, params.round_dist, params.dist_dtype)
     cvrp = CVRP(d, dem, cap, coord)
+    if params.granular_k:
+        cvrp.build_neighbors(params.granular_k)
     if params.seed:
         random.seed(params.seed)  # change/remove to allow new random behavior (and solutions)
     if params.time_limit is None:
@@ -26,8 +29,12 @@ def main(args):
             soln, t = cvrp.part_greedy_build(params.alpha)
         elif params.constructive == "GREEDY":
             soln, t = cvrp.greedy_build()
+        elif params.constructive == "PARTGREEDYSPLIT":
+            soln, t = cvrp.part_greedy_build(params.alpha, True)
+        elif params.constructive == "GREEDYSPLIT":
+            soln, t = cvrp.greedy_build(True)
         elif params.constructive == "SAVINGS":
-            soln, t = cvrp.greedy_build_savings()
+            soln, t = cvrp.greedy_build_savings(params.savings_granular == 1)
     print("Initial solution of cost: ", round(soln.fs, 2))
     print(soln.s)
     print(soln.cap)
@@ -36,16 +43,26 @@ def main(args):
 
     # run selected algorithm
     print("Running", params.algorithm)
-    if params.algorithm == "GRASP":
+    if params.algorithm == "GRASP" and params.workers > 1:
+        soln, t, data = parallel.parallel_grasp(cvrp, soln, params)
+    elif params.algorithm == "GRASP":
         soln, t, data = ls_metaheuristics.grasp(cvrp, soln, params)
     elif params.algorithm == "TS":
         soln, t, data = ls_metaheuristics.tabu_search(cvrp, soln, params)
     elif params.algorithm == "SA":
         soln, t, data = ls_metaheuristics.simulated_annealing(cvrp, soln, params)
+    elif params.algorithm == "PT":
+        soln, t, data = parallel.parallel_tempering(cvrp, soln, params)
+    elif params.algorithm in ("VNS", "ILS") and params.workers > 1:
+        soln, t, data = parallel.parallel_search(cvrp, soln, params)
     elif params.algorithm == "VNS":
         soln, t, data = ls_metaheuristics.vns(cvrp, soln, params)
     elif params.algorithm == "ILS":
         soln, t, data = ls_metaheuristics.ils(cvrp, soln, params)
+    elif params.algorithm == "GA" and params.ga_islands > 1:
+        soln, t, data = parallel.island_genetic_algorithm(cvrp, soln, params)
+    elif params.algorithm == "GA" and params.workers > 1:
+        soln, t, data = parallel.parallel_genetic_algorithm(cvrp, soln, params)
     elif params.algorithm == "GA":
         soln, t, data = pop_metaheuristics.genetic_algorithm(cvrp, soln, params)
     elif params.algorithm == "FIXOPT":
@@ -30,24 +30,21 @@ class CVRPModel:
         """"Build solution object from variable values in MIP model"""
         if self.model.num_solutions == 0:
             return
-        s = [[0, 0] for _ in range(self.inst.v)]
-        for i in range(self.inst.n):
-            for k in range(self.inst.v):
-                if self.t[i, k].x >= 0.00001:
-                    if i not in s[k]:
-                        s[k].insert(-2, i)
-                    pos_i = s[k].index(i)
-                    for j in range(self.inst.n):
-                        if i != j:
-                            if self.x[i, j].x >= 0.00001 and j not in s[k]:
-                                # insert j after i
-                                s[k].insert(pos_i, j)
-                            if self.x[j, i].x >= 0.00001 and j not in s[k]:
-                                # insert j before i
-                                s[k].insert(pos_i - 1, j)
-                    break
+        # routes follow the arcs leaving the depot (every customer is entered and left once)
+        n = self.inst.n
+        succ = [0] * n
+        for i in range(1, n):
+            succ[i] = next(j for j in range(n) if j != i and self.x[i, j].x >= 0.5)
+        s = []
+        for j in range(1, n):
+            if self.x[0, j].x >= 0.5:
+                route = [0]
+                while j != 0:
+                    route.append(j)
+                    j = succ[j]
+                s.append(route + [0])
         fs = self.model.objective_value
-        return solution.Solution(s, fs)
+        return solution.Solution(s, fs).eval_routes(self.inst)  # route caches used by the move evaluators
 
     def convert_aux_soln(self, s):
         s_aux = [[0 for _ in range(self.inst.n)] for _ in range(self.inst.n)]
@@ -73,7 +70,7 @@ class CVRPModel:
             for i in range(self.inst.n):
                 for k in range(self.inst.v):
                     if it == 1:
-                        if i in self.soln.s[k]:
+                        if self.soln.in_route(i, k):
                             self.t[i, k].ub = self.t[i, k].lb = 1.0
                         else:
                             self.t[i, k].ub = self.t[i, k].lb = 0.0
@@ -128,7 +125,7 @@ class CVRPModel:
                 for k in unfixed_routes:
                     self.t[i, k].lb = 0
                     self.t[i, k].ub = 1
-                    if (it == 1 and i in self.soln.s[k]) or (it != 1 and self.t[i, k].x > 0.999):
+                    if (it == 1 and self.soln.in_route(i, k)) or (it != 1 and self.t[i, k].x > 0.999):
                         for j in range(self.inst.n):
                             if i != j:
                                 self.x[i, j].lb = self.x[j, i].lb = 0
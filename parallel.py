@@ -0,0 +1,282 @@
+import copy
+import math
+import multiprocessing as mp
+import random
+import time
+from multiprocessing import shared_memory
+import numpy as np
+import local_search as ls
+import ls_metaheuristics
+import pop_metaheuristics
+from cvrp import CVRP
+
+_cvrp = None  # instance of a worker process, built over the shared memory blocks
+_blocks = []  # shared memory blocks attached by a worker process (kept open while it lives)
+_fs_star = None  # best cost found by any worker (shared value)
+
+
+def share_instance(cvrp):
+    """Copy the instance arrays (distances, demands and granular candidates, if built) into shared memory blocks.
+    Returns the blocks, owned by the caller that must unlink them, and a picklable descriptor to attach to them"""
+    blocks, arrays = [], {}
+    for name in ("d_arr", "dem_arr", "neigh_arr"):
+        arr = getattr(cvrp, name)
+        if arr is None:
+            continue
+        shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+        blocks.append(shm)
+        arrays[name] = (shm.name, arr.shape, arr.dtype.str)
+    return blocks, (arrays, cvrp.cap, cvrp.coord)
+
+
+def attach_instance(desc, fs_star=None):
+    """Worker initializer: build the instance over the shared memory blocks of desc (see share_instance), without
+    copying the distance matrix. The shared best cost fs_star is optional"""
+    global _cvrp, _fs_star
+    _fs_star = fs_star
+    arrays, cap, coord = desc
+    views = {}
+    for name, (shm_name, shape, dtype) in arrays.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _blocks.append(shm)
+        views[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    _cvrp = CVRP(views["d_arr"], views["dem_arr"], cap, coord)
+    if "neigh_arr" in views:
+        _cvrp.neigh_arr = views["neigh_arr"]
+        _cvrp.neigh = _cvrp.neigh_arr.tolist()
+
+
+def run_chain(task):
+    """Worker task: run one epoch of a chain (ILS or VNS) from its incumbent solution"""
+    algorithm, soln, params, seed = task
+    random.seed(seed)
+    if algorithm == "ILS":
+        return ls_metaheuristics.ils(_cvrp, soln, params)
+    elif algorithm == "VNS":
+        return ls_metaheuristics.vns(_cvrp, soln, params)
+
+
+def parallel_search(cvrp, soln, params):
+    """Run params.workers independent ILS or VNS chains (params.algorithm) in a process pool, with the instance in
+    shared memory. Every params.migration_time secs, each chain adopts the incumbent of its predecessor (ring) if it is
+    better. Returns the best solution of all chains and their merged convergence data"""
+    t_init = time.time()
+    seed = params.seed if params.seed else random.randrange(2 ** 31)
+    solns = [soln] * params.workers
+    chart_data = []
+    epoch = 0
+    blocks, desc = share_instance(cvrp)
+    try:
+        with mp.Pool(params.workers, initializer=attach_instance, initargs=(desc,)) as pool:
+            while time.time() - t_init < params.time_limit:
+                t_epoch = time.time() - t_init
+                params_ = copy.copy(params)
+                params_.time_limit = min(params.migration_time, params.time_limit - t_epoch)
+                params_.verbose = 0
+                tasks = [(params.algorithm, solns[w], params_, f"{seed}-{w}-{epoch}") for w in range(params.workers)]
+                results = pool.map(run_chain, tasks)
+                solns = [soln_ for soln_, t, data in results]
+                for soln_, t, data in results:
+                    chart_data.extend([t_epoch + x[0], x[1], x[2]] for x in data)
+                # migration: each chain takes the incumbent of its predecessor in the ring if it is better
+                solns = [solns[w - 1] if solns[w - 1].fs < solns[w].fs else solns[w] for w in range(params.workers)]
+                epoch += 1
+                if params.verbose:
+                    print(f'| epoch: {epoch:4d}  |  s*: {min(soln_.fs for soln_ in solns):10.2f}  |  time: {time.time() - t_init:10.2f} |')
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+    # merge the convergence data of all chains: best cost so far over every chain
+    chart_data.sort(key=lambda x: x[0])
+    fs_star = float("inf")
+    for x in chart_data:
+        fs_star = min(fs_star, x[2])
+        x[2] = fs_star
+    return min(solns, key=lambda soln_: soln_.fs), time.time() - t_init, chart_data
+
+
+def run_grasp(task):
+    """Worker task: GRASP iterations until the time limit (from t_init, common to all workers). Starts whose cost
+    exceeds the best cost of all workers by more than params.grasp_prune (ratio) skip the local search"""
+    params, seed, t_init = task
+    random.seed(seed)
+    soln_star = None
+    chart_data = []
+    it = 0
+    while time.time() - t_init < params.time_limit:
+        it += 1
+        soln, t = _cvrp.part_greedy_build(params.grasp_alpha)
+        chart_data.append([time.time() - t_init, soln.fs, _fs_star.value])
+        if params.grasp_prune and soln.fs > (1 + params.grasp_prune) * _fs_star.value:
+            continue  # hopeless start
+        soln, t = ls.local_search(_cvrp, soln, params)
+        if soln_star is None or soln.fs < soln_star.fs:
+            soln_star = soln
+            with _fs_star.get_lock():
+                if soln.fs < _fs_star.value:
+                    _fs_star.value = soln.fs
+        chart_data.append([time.time() - t_init, soln.fs, _fs_star.value])
+    return soln_star, chart_data, it
+
+
+def parallel_grasp(cvrp, soln, params):
+    """Greedy Randomized Adaptive Search Procedure with its iterations spread over params.workers processes (seeded
+    from params.seed), with the instance in shared memory and the best cost shared by all workers"""
+    t_init = time.time()
+    seed = params.seed if params.seed else random.randrange(2 ** 31)
+    fs_star = mp.Value("d", soln.fs)
+    blocks, desc = share_instance(cvrp)
+    try:
+        with mp.Pool(params.workers, initializer=attach_instance, initargs=(desc, fs_star)) as pool:
+            tasks = [(params, f"{seed}-{w}", t_init) for w in range(params.workers)]
+            results = pool.map(run_grasp, tasks)
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+    chart_data = sorted((x for soln_, data, it in results for x in data), key=lambda x: x[0])
+    if params.verbose:
+        print(f'| workers: {params.workers:3d}  |  it: {sum(it for soln_, data, it in results):8d}  |  s*: {fs_star.value:10.2f}  |  time: {time.time() - t_init:10.2f} |')
+    for soln_, data, it in results:
+        if soln_ is not None and soln_.fs < soln.fs:
+            soln = soln_
+    return soln, time.time() - t_init, chart_data
+
+
+def run_breed(task):
+    """Worker task: offspring pipeline of a pair of parents (see pop_metaheuristics.breed)"""
+    parent_one, parent_two, params, seed = task
+    return pop_metaheuristics.breed(_cvrp, parent_one, parent_two, params, seed)
+
+
+def parallel_genetic_algorithm(cvrp, soln, params):
+    """Genetic algorithm with the offspring of each generation bred in a process pool, with the instance in shared
+    memory (children come back pickled as giant tours). Each pipeline has its own random stream, so that results under
+    a fixed seed do not depend on the number of workers"""
+    blocks, desc = share_instance(cvrp)
+    try:
+        with mp.Pool(params.workers, initializer=attach_instance, initargs=(desc,)) as pool:
+            def breed_map(tasks):
+                return pool.map(run_breed, [(parent_one, parent_two, params, seed)
+                                            for parent_one, parent_two, seed in tasks])
+            return pop_metaheuristics.genetic_algorithm(cvrp, soln, params, breed_map)
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+
+def run_island(task):
+    """Worker task: evolve the population of an island (built if None) for a number of generations, until the time
+    limit (from t_init). Returns the population and its convergence data, tagged with the island index"""
+    k, population, params, seed, generations, t_init = task
+    random.seed(seed)
+    if population is None:
+        population = pop_metaheuristics.initial_population(_cvrp, params)
+    breed_map = lambda tasks: pop_metaheuristics.breed_serial(_cvrp, tasks, params)
+    chart_data = []
+    for _ in range(generations):
+        if time.time() - t_init >= params.time_limit:
+            break
+        population = pop_metaheuristics.generation(_cvrp, population, params, breed_map)
+        chart_data.append([time.time() - t_init, population[-1].fs, population[-1].fs, k])
+    return population, chart_data
+
+
+def island_genetic_algorithm(cvrp, soln, params):
+    """Island model genetic algorithm: params.ga_islands populations evolve in separate processes (with the instance
+    in shared memory) and every params.ga_migration generations their best individuals migrate over a RING or RANDOM
+    topology (params.ga_topology). Convergence data has the island of each point in a fourth column"""
+    t_init = time.time()
+    seed = params.seed if params.seed else random.randrange(2 ** 31)
+    populations = [None] * params.ga_islands
+    chart_data = []
+    it = epoch = 0
+    blocks, desc = share_instance(cvrp)
+    try:
+        with mp.Pool(params.ga_islands, initializer=attach_instance, initargs=(desc,)) as pool:
+            while it < params.ga_generation_max and time.time() - t_init < params.time_limit:
+                generations = min(params.ga_migration, params.ga_generation_max - it)
+                tasks = [(k, populations[k], params, f"{seed}-{k}-{epoch}", generations, t_init)
+                         for k in range(params.ga_islands)]
+                results = pool.map(run_island, tasks)
+                populations = [population for population, data in results]
+                for population, data in results:
+                    chart_data.extend(data)
+                pop_metaheuristics.migration(populations, params.ga_topology)
+                it += generations
+                epoch += 1
+                if params.verbose:
+                    print(f'| it: {it:6d}  |  s*: {min(population[-1].fs for population in populations):10.2f}  |  time: {time.time() - t_init:10.2f} |  islands: ', end="")
+                    for population in populations:
+                        print(round(population[-1].fs, 2), end=" ")
+                    print()
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+    # merge the convergence data of all islands: best cost so far over every island
+    chart_data.sort(key=lambda x: x[0])
+    fs_star = float("inf")
+    for x in chart_data:
+        fs_star = min(fs_star, x[2])
+        x[2] = fs_star
+    ind_star = min((population[-1] for population in populations if population), key=lambda ind: ind.fs)
+    return ind_star, time.time() - t_init, chart_data
+
+
+def run_replica(task):
+    """Worker task: run a level of trial moves of a replica at its (fixed) temperature (see ls_metaheuristics.sa_level).
+    Returns the replica solution and the best one it found"""
+    soln, t, n_trials, seed = task
+    random.seed(seed)
+    soln_star = soln.copy()
+    ls_metaheuristics.sa_level(_cvrp, soln, soln_star, t, n_trials, np.random.default_rng(random.getrandbits(64)))
+    return soln, soln_star
+
+
+def parallel_tempering(cvrp, soln, params):
+    """Parallel tempering (replica exchange) https://doi.org/10.1143/JPSJ.65.1604: params.pt_replicas SA replicas at a
+    geometric ladder of fixed temperatures, from the initial SA temperature down to ls_metaheuristics.SA_T_MIN (a single
+    replica stays at the initial one), run levels of trial moves in a pool of params.workers processes (with the
+    instance in shared memory). After each level, adjacent replicas (alternating even and odd pairs) swap their
+    solutions with the Metropolis criterion"""
+    t_init = time.time()
+    seed = params.seed if params.seed else random.randrange(2 ** 31)
+    t_0 = ls_metaheuristics.initial_temperature(cvrp, soln, params)
+    n = params.pt_replicas
+    if n == 1:
+        T = [t_0]  # a single replica runs at the initial temperature
+    else:
+        T = [ls_metaheuristics.SA_T_MIN * (t_0 / ls_metaheuristics.SA_T_MIN) ** (k / (n - 1)) for k in range(n)]
+    solns = [soln] * n  # replica solutions, from the coldest to the hottest
+    soln_star = soln.copy()
+    chart_data = []
+    epoch = swaps = 0
+    blocks, desc = share_instance(cvrp)
+    try:
+        with mp.Pool(params.workers, initializer=attach_instance, initargs=(desc,)) as pool:
+            while time.time() - t_init < params.time_limit:
+                tasks = [(solns[k], T[k], params.sa_max * len(cvrp.d), f"{seed}-{k}-{epoch}") for k in range(n)]
+                results = pool.map(run_replica, tasks)
+                solns = [soln_ for soln_, soln_star_ in results]
+                for soln_, soln_star_ in results:
+                    if soln_star_.fs < soln_star.fs:
+                        soln_star = soln_star_
+                # replica exchange: accept if (1 / T[k] - 1 / T[k + 1]) * (fs[k] - fs[k + 1]) > log(u)
+                for k in range(epoch % 2, n - 1, 2):
+                    exponent = (1 / T[k] - 1 / T[k + 1]) * (solns[k].fs - solns[k + 1].fs)
+                    if exponent > math.log(1 - random.random()):
+                        solns[k], solns[k + 1] = solns[k + 1], solns[k]
+                        swaps += 1
+                epoch += 1
+                chart_data.append([time.time() - t_init, solns[0].fs, soln_star.fs])
+                if params.verbose:
+                    print(f'| epoch: {epoch:6d}  |  s: {solns[0].fs:10.2f}  |  s*: {soln_star.fs:10.2f}  |  time: {time.time() - t_init:10.2f} |  swaps: {swaps:6d} |')
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+    return soln_star, time.time() - t_init, chart_data
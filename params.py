@@ -14,19 +14,30 @@ class Params:
         self.output = 1
         self.chart = 1
         self.threads = 0
+        self.workers = 1
+        self.migration_time = 10
+        self.round_dist = 0
+        self.dist_dtype = "float64"
 
         self.constructive = "SAVINGS"
         self.alpha = 0.10
+        self.savings_granular = 0
 
         self.algorithm = "ILS"
         self.local_search = "RANDOM*"
         self.neigh_types = 2
+        self.granular_k = 0
         self.ls_max = 100
 
         self.grasp_alpha = 0.10
+        self.grasp_prune = 0
         self.sa_alpha = 0.90
         self.sa_max = 100
         self.sa_t_0 = 5
+        self.sa_calibration = "NONE"
+        self.sa_schedule = "GEOMETRIC"
+        self.sa_reheat = 0
+        self.pt_replicas = 4
         self.tabu_max = 10
         self.vns_k_max = 2
         self.vns_p_level = 5
@@ -34,8 +45,12 @@ class Params:
         self.ga_pop_size = 10
         self.ga_mutation_rate = 0.05
         self.ga_crossover_rate = 0.8
+        self.ga_crossover_op = "OX"
         self.ga_local_search_rate = 0.1
         self.ga_generation_max = 100000
+        self.ga_islands = 1
+        self.ga_migration = 10
+        self.ga_topology = "RING"
         self.fix_opt_n = 3
         self.fix_opt_it_tl = 120
 
@@ -87,6 +102,22 @@ class Params:
                 self.threads = int(args[i+1])
                 print("Number of threads set to %d" % self.threads)
                 i += 2
+            elif args[i] == "-workers":
+                self.workers = int(args[i+1])
+                print("Number of parallel worker processes set to %d" % self.workers)
+                i += 2
+            elif args[i] == "-migration_time":
+                self.migration_time = float(args[i+1])
+                print("Migration interval of parallel workers set to %f" % self.migration_time)
+                i += 2
+            elif args[i] == "-round_dist":
+                self.round_dist = int(args[i+1])
+                print("Distances rounded by TSPLIB convention (0.no/1.yes) %d" % self.round_dist)
+                i += 2
+            elif args[i] == "-dist_dtype":
+                self.dist_dtype = args[i+1]
+                print("Distance matrix data type set to %s" % self.dist_dtype)
+                i += 2
             elif args[i] == "-constructive":
                 self.constructive = args[i + 1]
                 print("Constructive method set to %s" % self.constructive)
@@ -95,6 +126,10 @@ class Params:
                 self.alpha = float(args[i+1])
                 print("Alpha (partially greedy constriction) set to %f" % self.alpha)
                 i += 2
+            elif args[i] == "-savings_granular":
+                self.savings_granular = int(args[i + 1])
+                print("Savings between k nearest neighbors only set to %d" % self.savings_granular)
+                i += 2
             elif args[i] == "-algorithm":
                 self.algorithm = args[i + 1]
                 print("Method value set to '%s'" % self.algorithm)
@@ -107,6 +142,10 @@ class Params:
                 self.ls_max = int(args[i + 1])
                 print("Max local search iters (* num cities) set to %d" % self.ls_max)
                 i += 2
+            elif args[i] == "-granular_k":
+                self.granular_k = int(args[i + 1])
+                print("Granular neighborhoods (k nearest neighbors, 0 = full) set to %d" % self.granular_k)
+                i += 2
             elif args[i] == "-neigh_types":
                 self.neigh_types = int(args[i + 1])
                 print("Number of neighborhood types set to %d" % self.neigh_types)
@@ -115,6 +154,10 @@ class Params:
                 self.grasp_alpha = float(args[i + 1])
                 print("GRASP alpha set to %f" % self.grasp_alpha)
                 i += 2
+            elif args[i] == "-grasp_prune":
+                self.grasp_prune = float(args[i+1])
+                print("GRASP pruning ratio of parallel workers set to %f" % self.grasp_prune)
+                i += 2
             elif args[i] == "-sa_alpha":
                 self.sa_alpha = float(args[i + 1])
                 print("SA alpha set to %f" % self.sa_alpha)
@@ -127,9 +170,25 @@ class Params:
                 self.sa_t_0 = int(args[i + 1])
                 print("SA initial temperature set to %d" % self.sa_t_0)
                 i += 2
+            elif args[i] == "-sa_calibration":
+                self.sa_calibration = args[i + 1]
+                print("SA initial temperature calibration set to %s" % self.sa_calibration)
+                i += 2
+            elif args[i] == "-sa_schedule":
+                self.sa_schedule = args[i + 1]
+                print("SA cooling schedule set to %s" % self.sa_schedule)
+                i += 2
+            elif args[i] == "-sa_reheat":
+                self.sa_reheat = int(args[i + 1])
+                print("SA reheating after %d levels without improvement" % self.sa_reheat)
+                i += 2
+            elif args[i] == "-pt_replicas":
+                self.pt_replicas = int(args[i + 1])
+                print("PT number of replicas set to %d" % self.pt_replicas)
+                i += 2
             elif args[i] == "-tabu_max":
                 self.tabu_max = int(args[i + 1])
-                print("Tabu list size set to %d" % self.tabu_max)
+                print("Tabu tenure set to %d" % self.tabu_max)
                 i += 2
             elif args[i] == "-vns_k_max":
                 self.vns_k_max = int(args[i + 1])
@@ -159,10 +218,26 @@ class Params:
                 self.ga_crossover_rate = float(args[i + 1])
                 print("GA crossover rate set to %f" % self.ga_crossover_rate)
                 i += 2
+            elif args[i] == "-ga_crossover_op":
+                self.ga_crossover_op = args[i + 1]
+                print("GA crossover operator set to %s" % self.ga_crossover_op)
+                i += 2
             elif args[i] == "-ga_ls":
                 self.ga_local_search_rate = float(args[i + 1])
                 print("GA local search rate set to %f" % self.ga_local_search_rate)
                 i += 2
+            elif args[i] == "-ga_islands":
+                self.ga_islands = int(args[i + 1])
+                print("GA number of islands set to %d" % self.ga_islands)
+                i += 2
+            elif args[i] == "-ga_migration":
+                self.ga_migration = int(args[i + 1])
+                print("GA migration interval (generations) set to %d" % self.ga_migration)
+                i += 2
+            elif args[i] == "-ga_topology":
+                self.ga_topology = args[i + 1]
+                print("GA migration topology set to %s" % self.ga_topology)
+                i += 2
             elif args[i] == "-fixopt_it_tl":
                 self.fix_opt_it_tl = int(args[i + 1])
                 print("Fix-Opt time limit for each iteration set to %d" % self.fix_opt_it_tl)
@@ -190,29 +265,46 @@ class Params:
         print(f"  -lb <value>           : lower bound for this instance (default: {self.lb}).")
         print(f"  -output <0/1>         : plot the solution to /output folder (0/1) (default: {self.output}).")
         print(f"  -chart <0/1>          : write convergence chart to /output folder (0/1)  (default: {self.chart}).")
+        print(f"  -workers <n>          : number of worker processes for ILS/VNS chains, GRASP iterations, GA offspring or PT replicas (1 = serial) (default: {self.workers}).")
+        print(f"  -migration_time <t>   : interval (secs) between incumbent exchanges of parallel chains (default: {self.migration_time}).")
+        print(f"  -round_dist <0/1>     : round distances by the TSPLIB95 EDGE_WEIGHT_TYPE convention (EUC_2D, CEIL_2D, ATT) (default: {self.round_dist}).")
+        print(f"  -dist_dtype <value>   : distance matrix data type {{float64, float32}} (default: {self.dist_dtype}).")
         print(f"  -constructive <value> : select the constructive method to build initial solutions; possible values are")
-        print(f"                          {{GREEDY, PARTGREEDY, SAVINGS}} (default: {self.constructive})")
+        print(f"                          {{GREEDY, PARTGREEDY, SAVINGS, GREEDYSPLIT, PARTGREEDYSPLIT}} (default: {self.constructive});")
+        print(f"                          *SPLIT: giant tour optimally split into routes (route-first cluster-second)")
         print(f"  -alpha <value>        : alpha value to the partially greedy constructive algorithm (default: {self.alpha}).")
+        print(f"  -savings_granular <0/1>: SAVINGS only considers savings between k nearest neighbors (needs -granular_k) (default: {self.savings_granular}).")
         print(f"  -algorithm <value>    : select the optimization algorithm to execute; possible values are")
-        print(f"                          {{GRASP, TS, SA, VNS, ILS, FIXOPT, MIP}} (default: {self.algorithm})")
+        print(f"                          {{GRASP, TS, SA, PT, VNS, ILS, FIXOPT, MIP}} (default: {self.algorithm})")
         print(f"  -local_search <value> : local search method to use inside the main algorithm; possible values are")
         print(f"                          {{RANDOM*, RANDOM2OPT, RANDOMINTER, DESCENT2OPT, DESCENTINTER, FIRSTIMPROV2OPT, FIRSTIMPROVINTER, VNDFIRSTIMPROV, VND}}")
         print(f"                          (2OPT = 2-opt | INTER = Inter-route best swap | * = both) (default: {self.local_search})")
         print(f"  -neigh_types <n>      : number of neighborhood types to apply (1=2-opt / 2=2-opt and 3-opt) (default: {self.neigh_types}).")
+        print(f"  -granular_k <k>       : restrict neighborhoods to moves creating an edge to the k nearest neighbors (0 = full) (default: {self.granular_k}).")
         print(f"  -ls_max <n>           : maximum number of random local search iters (default: {self.ls_max}).")
         print(f"  -grasp_alpha <value>  : alpha value to GRASP algorithm (default: {self.grasp_alpha}).")
+        print(f"  -grasp_prune <value>  : parallel GRASP skips the local search of starts costing over (1 + value) * best (0 = never) (default: {self.grasp_prune}).")
         print(f"  -sa_t_0 <value>       : initial temperature value to Simulated Annealing algorithm (default: {self.sa_t_0}).")
         print(f"  -sa_alpha <value>     : alpha value to Simulated Annealing algorithm (default: {self.sa_alpha}).")
         print(f"  -sa_max <value>       : SAmax value (* num cities) to Simulated Annealing algorithm (default: {self.sa_max}).")
-        print(f"  -tabu_max <value>     : size of tabu list of Tabu Search algorithm (default: {self.tabu_max}).")
+        print(f"  -sa_calibration <v>   : calibrate the SA initial temperature instead of -sa_t_0 {{NONE, SIMULATION, SAMPLING}} (default: {self.sa_calibration}).")
+        print(f"  -sa_schedule <value>  : SA cooling schedule: GEOMETRIC (by -sa_alpha, restarting once cold) or TIME (ending cold at the")
+        print(f"                          time limit, from the measured trials/sec) (default: {self.sa_schedule}).")
+        print(f"  -sa_reheat <n>        : SA reheats to the temperature of the last improvement after n levels without one (0 = never) (default: {self.sa_reheat}).")
+        print(f"  -pt_replicas <n>      : number of PT replicas, at temperatures from the SA initial one down to 0.001 (1 = at the initial one) (default: {self.pt_replicas}).")
+        print(f"  -tabu_max <value>     : tabu tenure (iterations) of the move attributes of Tabu Search (default: {self.tabu_max}).")
         print(f"  -vns_max_k <value>    : maximum neighborhood size to VNS algorithm (default: {self.vns_k_max}).")
         print(f"  -vns_p_level <value>  : perturbation level to VNS algorithm (default: {self.vns_p_level}).")
         print(f"  -ils_p_level <value>  : perturbation level to ILS algorithm (default: {self.ils_p_level}).")
         print(f"  -ga_pop_size <value>  : size of population for GA (default: {self.ga_pop_size}).")
         print(f"  -ga_gen_max <value>   : maximum number of generations for GA (default: {self.ga_generation_max}).")
         print(f"  -ga_crossover <value> : crossover rate for GA (default: {self.ga_crossover_rate}).")
+        print(f"  -ga_crossover_op <op> : crossover operator for GA {{OX, PMX, ERX, SREX}} (default: {self.ga_crossover_op}).")
         print(f"  -ga_mutation <value>  : mutation rate for GA (default: {self.ga_mutation_rate}).")
         print(f"  -ga_ls <value>        : local search rate for GA (default: {self.ga_local_search_rate}).")
+        print(f"  -ga_islands <value>   : number of GA islands, each evolving in its own process (1 = no islands) (default: {self.ga_islands}).")
+        print(f"  -ga_migration <value> : generations between migrations of the best individuals of islands (default: {self.ga_migration}).")
+        print(f"  -ga_topology <value>  : migration topology of GA islands {{RING, RANDOM}} (default: {self.ga_topology}).")
         print(f"  -fixopt_it_tl <time>  : runtime limit (secs) for each iteration of fixopt (default: {self.fix_opt_it_tl}).")
         print(f"  -fixopt_n <n>         : number of cities to be optimized at each iteration of fixopt (default: {self.fixopt_n}).")
         print(f"")
@@ -1,8 +1,8 @@
+import crossover
 import local_search as ls
 import time
 import random
 import math
-from solution import Solution
 
 
 def mutation_swap(cvrp, individual, mutation_rate):
@@ -11,114 +11,6 @@ def mutation_swap(cvrp, individual, mutation_rate):
         individual.move_to_neighbor(N, cvrp)
 
 
-def crossover_ox(cvrp, parent_one, parent_two):
-    parent_one = parent_one.s
-    parent_two = parent_two.s
-    # create a giant tours
-    parent_one_tour = []
-    parent_two_tour = []
-    for r in range(len(parent_one)):
-        for i in range(1, len(parent_one[r]) - 1):
-            parent_one_tour.append(parent_one[r][i])
-    for r in range(len(parent_two)):
-        for i in range(1, len(parent_two[r]) - 1):
-            parent_two_tour.append(parent_two[r][i])
-
-    # print(parent_one_tour, parent_two_tour)
-    # two cut points
-    cut = random.sample(range(1, len(parent_one_tour) - 1), 2)
-    cut.sort()
-
-    # create empty children
-    child_one = [0] * len(parent_one_tour)
-    child_two = [0] * len(parent_two_tour)
-
-    # copy sequence between cut[0] and cut [1] from parent one to child one
-    c1, c2 = cut[0], cut[1] + 1
-    child_one[c1:c2] = parent_one_tour[c1:c2]
-    # The same for second child with parent two
-    child_two[c1:c2] = parent_two_tour[c1:c2]
-
-    # Starting from c2 until check all elements from parent two, insert on child one.
-    visit_order_p2 = parent_two_tour[c2:len(parent_two_tour)] + parent_two_tour[0:c2]
-    # Position to insert on child one - starting from c2
-    position = c2
-    for customer in visit_order_p2:
-        # If customer does not exist in child one:
-        if customer not in child_one:
-            child_one[position] = customer
-            position += 1
-
-            if position == len(child_one):
-                position = 0
-
-    # The same process for the child two
-    # This code will be rewrite as a function
-    visit_order_p1 = parent_one_tour[c2:len(parent_one_tour)] + parent_one_tour[0:c2]
-    # Position to insert on child one - starting from c2
-    position = c2
-    # print(f"Starting from: {position}")
-    # print(visit_order_p1)
-
-    for customer in visit_order_p1:
-        # If customer does not exist in child one:
-        if customer not in child_two:
-            # print(position)
-            child_two[position] = customer
-            position += 1
-
-            if position == len(child_two):
-                position = 0
-
-    # print(child_one, child_two)
-
-    # split (into routes) child individuals
-    child_one_cap = [0]
-    child_one_fs = 0
-    child_one_split = [[0]]
-    for n in child_one:
-        if child_one_cap[-1] + cvrp.dem[n] <= cvrp.cap:
-            child_one_split[-1].append(n)
-            child_one_cap[-1] += cvrp.dem[n]
-            child_one_fs += cvrp.d[child_one_split[-1][-2]][child_one_split[-1][-1]]
-        else:
-            # close and start a new route
-            child_one_split[-1].append(0)
-            child_one_fs += cvrp.d[child_one_split[-1][-2]][child_one_split[-1][-1]]
-            child_one_split.append([0])
-            child_one_split[-1].append(n)
-            child_one_fs += cvrp.d[child_one_split[-1][-2]][child_one_split[-1][-1]]
-            child_one_cap.append(cvrp.dem[n])
-    # close last route
-    child_one_split[-1].append(0)
-    child_one_fs += cvrp.d[child_one_split[-1][-2]][child_one_split[-1][-1]]
-
-    child_two_cap = [0]
-    child_two_fs = 0
-    child_two_split = [[0]]
-    for n in child_two:
-        if child_two_cap[-1] + cvrp.dem[n] <= cvrp.cap:
-            child_two_split[-1].append(n)
-            child_two_cap[-1] += cvrp.dem[n]
-            child_two_fs += cvrp.d[child_two_split[-1][-2]][child_two_split[-1][-1]]
-        else:
-            # close and start a new route
-            child_two_split[-1].append(0)
-            child_two_fs += cvrp.d[child_two_split[-1][-2]][child_two_split[-1][-1]]
-            child_two_split.append([0])
-            child_two_split[-1].append(n)
-            child_two_fs += cvrp.d[child_two_split[-1][-2]][child_two_split[-1][-1]]
-            child_two_cap.append(cvrp.dem[n])
-    # close last route
-    child_two_split[-1].append(0)
-    child_two_fs += cvrp.d[child_two_split[-1][-2]][child_two_split[-1][-1]]
-
-    child_one_split = Solution(child_one_split, child_one_fs, child_one_cap)
-    child_two_split = Solution(child_two_split, child_two_fs, child_two_cap)
-
-    return child_one_split, child_two_split
-
-
 def roulette_wheel_selection(population, nind_to_select):
 
     index_individuals = []
@@ -157,15 +49,40 @@ def linear_ranking(population, sp):
         population[i].probability = (population[i].fitness - min_value) / ( max_value - min_value )
 
 
-def genetic_algorithm(cvrp, soln, params):
-    # fitness - linear ranking
-    selective_pressure = 1.1
-    t_init = time.time()
-    chart_data = []
+def breed(cvrp, parent_one, parent_two, params, seed):
+    """Offspring pipeline of a pair of parents (crossover, mutation and local search), driven by its own random stream
+    so that it gives the same children wherever it runs"""
+    random.seed(seed)
+    # perform crossover
+    child_one, child_two = crossover.OPERATORS[params.ga_crossover_op](cvrp, parent_one, parent_two)
 
-    population = []
-    ind_star = Solution(None, float("inf"), None)
+    # perform mutation
+    mutation_swap(cvrp, child_one, params.ga_mutation_rate)
+    mutation_swap(cvrp, child_two, params.ga_mutation_rate)
+
+    # perform local search (costs and loads are kept up to date by the moves)
+    if random.random() < params.ga_local_search_rate:
+        child_one, _ = ls.local_search(cvrp, child_one, params)
 
+    if random.random() < params.ga_local_search_rate:
+        child_two, _ = ls.local_search(cvrp, child_two, params)
+    return child_one, child_two
+
+
+def breed_serial(cvrp, tasks, params):
+    """Offspring pipelines of (parent_one, parent_two, seed) tasks, one after the other in this process"""
+    state = random.getstate()  # pipelines use their own streams, the main one resumes afterwards
+    children = [breed(cvrp, parent_one, parent_two, params, seed) for parent_one, parent_two, seed in tasks]
+    random.setstate(state)
+    return children
+
+
+SELECTIVE_PRESSURE = 1.1  # fitness - linear ranking
+
+
+def initial_population(cvrp, params):
+    """Build and rank an initial population: a greedy individual and partially greedy ones"""
+    population = []
     individual, t = cvrp.greedy_build()
     population.append(individual)
 
@@ -177,68 +94,84 @@ def genetic_algorithm(cvrp, soln, params):
 
     # sort population using objective cost of linear ranking
     # population.sort(reverse = True, key = lambda i: i.fs)
-    linear_ranking(population, selective_pressure)
+    linear_ranking(population, SELECTIVE_PRESSURE)
+    return population
 
-    index_best = len(population) - 1 # It is the last
-    ind_star = population[index_best].copy()
 
-    for it in range(1, params.ga_generation_max + 1):
-        # imposing a time limit
-        if time.time() - t_init >= params.time_limit:
-            break
+def generation(cvrp, population, params, breed_map):
+    """Evolve a population for one generation, returning the next (ranked) population"""
+    # rank population (it keeps the order of a ranked one; individuals coming from other processes have no fitness)
+    linear_ranking(population, SELECTIVE_PRESSURE)
 
-        descendants = []
+    # select the parents of each offspring, with the random stream of its pipeline
+    tasks = []
+    for _ in range(params.ga_pop_size):
+        if random.random() <= params.ga_crossover_rate:
+            [pi, pj] = roulette_wheel_selection(population, 2)
+            tasks.append((population[pi], population[pj], random.getrandbits(64)))
 
-        # for each individual
-        for _ in range(params.ga_pop_size):
-            if random.random() <= params.ga_crossover_rate:
-                # select parents
-                [pi, pj] = roulette_wheel_selection(population, 2)
+    # perform crossover, mutation and local search, and add children to descendants population
+    descendants = []
+    for child_one, child_two in breed_map(tasks):
+        descendants.append(child_one)
+        descendants.append(child_two)
 
-                # perform crossover
-                child_one, child_two = crossover_ox(cvrp, population[pi], population[pj])
+    # merge: current population and descendants
+    merge = population + descendants
 
-                # perform mutation
-                mutation_swap(cvrp, child_one, params.ga_mutation_rate)
-                mutation_swap(cvrp, child_two, params.ga_mutation_rate)
+    # evaluate and rank population
+    linear_ranking(merge, SELECTIVE_PRESSURE)
 
-                # perform local search
-                fs = child_one.obj_eval(cvrp)
-                child_one.fs = fs
-                if random.random() < params.ga_local_search_rate:
-                    child_one, _ = ls.local_search(cvrp, child_one, params)
+    # select the survivors
+    survivors = roulette_wheel_selection(merge, params.ga_pop_size)
 
-                fs = child_two.obj_eval(cvrp)
-                child_two.fs = fs
-                if random.random() < params.ga_local_search_rate:
-                    child_two, _ = ls.local_search(cvrp, child_two, params)
+    # update population for the next generation
+    population = []
 
-                # add children to descendants population
-                descendants.append(child_one)
-                descendants.append(child_two)
+    # elitism
+    last = len(merge) - 1
+    population.append(merge[last].copy())
 
-        # merge: current population and descendants
-        merge = population + descendants
+    for index in survivors:
+        population.append(merge[index].copy())
+        if len(population) == params.ga_pop_size:
+            break
 
-        # evaluate and rank population
-        linear_ranking(merge, selective_pressure)
+    linear_ranking(population, SELECTIVE_PRESSURE)
+    return population
 
-        # select the survivors
-        survivors = roulette_wheel_selection(merge, params.ga_pop_size)
 
-        # update population for the next generation
-        population = []
+def migration(populations, topology):
+    """Migration between islands: the best individual of each island replaces the worst one of another island, the
+    next one (RING topology) or a random one (RANDOM topology). Populations are ranked (the best is the last one)"""
+    emigrants = [population[-1] for population in populations]
+    for k in range(len(populations)):
+        if topology == "RANDOM":
+            dest = random.choice([k_ for k_ in range(len(populations)) if k_ != k])
+        else:
+            dest = (k + 1) % len(populations)
+        populations[dest][0] = emigrants[k].copy()
 
-        # elitism
-        last = len(merge) - 1
-        population.append(merge[last].copy())
 
-        for index in survivors:
-            population.append(merge[index].copy())
-            if len(population) == params.ga_pop_size:
-                break
+def genetic_algorithm(cvrp, soln, params, breed_map=None):
+    """Genetic algorithm. The offspring pipelines of a generation are run by breed_map(tasks), that returns the
+    children of each (parent_one, parent_two, seed) task (default: breed_serial)"""
+    if breed_map is None:
+        breed_map = lambda tasks: breed_serial(cvrp, tasks, params)
+    t_init = time.time()
+    chart_data = []
+
+    population = initial_population(cvrp, params)
+
+    index_best = len(population) - 1 # It is the last
+    ind_star = population[index_best].copy()
+
+    for it in range(1, params.ga_generation_max + 1):
+        # imposing a time limit
+        if time.time() - t_init >= params.time_limit:
+            break
 
-        linear_ranking(population, selective_pressure)
+        population = generation(cvrp, population, params, breed_map)
 
         index_best = len(population) - 1 # it is the last individual
         chart_data.append([time.time() - t_init, population[index_best].fs, ind_star.fs])
@@ -252,4 +185,4 @@ def genetic_algorithm(cvrp, soln, params):
                 print(round(ind.fs, 2), end=" ")
             print()
 
-    return ind_star, time.time() - t_init, chart_data
\ No newline at end of file
+    return ind_star, time.time() - t_init, chart_data
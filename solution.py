@@ -1,135 +1,323 @@
-import copy
+import itertools
+import numpy as np
+
+INS_MIN_LEN = 16  # shorter routes are scanned directly instead of using cached cheapest insertions
+
 
 class Solution:
+    __slots__ = ("s", "fs", "cap", "dist", "route_of", "pos_of", "log", "fitness", "probability")
 
-    def __init__(self, s, fs, cap: None):
+    def __init__(self, s, fs, cap=None, dist=None):
         self.s = s  # solution as a list of routes (sub-lists)
         self.fs = fs  # solution objective function cost
         self.cap = cap  # list of used capacities for each route
+        self.dist = dist  # list of distances (lengths) of each route
+        self.route_of = None  # route index of each customer (-1 for the depot)
+        self.pos_of = None  # position of each customer within its route
+        self.log = None  # undo log of the applied moves (None: not recording)
+        if s is not None:
+            self.build_index()
 
     def copy(self):
-        """"Return a copy of current solution"""
-        s = copy.deepcopy(self.s)
-        fs = self.fs
-        cap = self.cap[:]
-        soln = Solution(s, fs, cap)
+        """"Return a copy of current solution (flat lists are copied by slicing, indexes are not rebuilt)"""
+        soln = Solution(None, self.fs, self.cap[:], self.dist[:])
+        soln.s = [route[:] for route in self.s]
+        soln.route_of = self.route_of[:]
+        soln.pos_of = self.pos_of[:]
         return soln
 
+    def copy_into(self, other):
+        """"Copy current solution into other reusing its lists (no allocation while the route sizes fit)"""
+        s = other.s
+        del s[len(self.s):]
+        s.extend([] for _ in range(len(self.s) - len(s)))
+        for route_, route in zip(s, self.s):
+            route_[:] = route
+        other.fs = self.fs
+        other.cap[:] = self.cap
+        other.dist[:] = self.dist
+        other.route_of[:] = self.route_of
+        other.pos_of[:] = self.pos_of
+        if other.log is not None:
+            other.log.clear()
+        return other
+
+    def giant_tour(self):
+        """"Return the routes as a giant tour array (routes concatenated, depots included) and route-start offsets"""
+        starts = np.cumsum([0] + [len(route) for route in self.s])
+        return np.fromiter(itertools.chain.from_iterable(self.s), dtype=np.int32, count=starts[-1]), starts
+
+    @staticmethod
+    def from_giant_tour(tour, starts, fs, cap=None, dist=None):
+        """"Build a solution from a giant tour array and route-start offsets (see giant_tour)"""
+        tour = tour.tolist()
+        return Solution([tour[starts[r]:starts[r + 1]] for r in range(len(starts) - 1)], fs, cap, dist)
+
+    def __getstate__(self):
+        # compact pickling (e.g., between processes) as a giant tour, indexes are rebuilt on loading
+        tour, starts = self.giant_tour()
+        return tour, starts, self.fs, self.cap, self.dist
+
+    def __setstate__(self, state):
+        tour, starts, fs, cap, dist = state
+        soln = Solution.from_giant_tour(tour, starts, fs, cap, dist)
+        for attr in ("s", "fs", "cap", "dist", "route_of", "pos_of", "log"):
+            setattr(self, attr, getattr(soln, attr))
+
+    def eval_routes(self, cvrp):
+        """"Full evaluation of the cached loads (cap) and distances (dist) of each route"""
+        d, dem = cvrp.d, cvrp.dem
+        self.cap = []
+        self.dist = []
+        for route in self.s:
+            self.cap.append(sum(dem[x] for x in route))
+            self.dist.append(sum(d[route[i]][route[i + 1]] for i in range(len(route) - 1)))
+        return self
+
+    def is_feasible(self, cvrp):
+        """"Check vehicle capacity feasibility from the cached route loads"""
+        return all(load <= cvrp.cap for load in self.cap)
+
+    # node-to-route/position index
+    def build_index(self):
+        """"Build the node-to-route (route_of) and node-to-position (pos_of) indexes from scratch"""
+        n = 1 + max((max(route) for route in self.s if route), default=0)
+        self.route_of = [-1] * n
+        self.pos_of = [0] * n
+        for r in range(len(self.s)):
+            if self.s[r]:
+                self.update_index(r)
+
+    def update_index(self, r, start=1, end=None):
+        """"Update the indexes of the customers at positions [start...end) of route r (default: whole route)"""
+        route, route_of, pos_of = self.s[r], self.route_of, self.pos_of
+        if end is None:
+            end = len(route) - 1
+        for idx in range(start, end):
+            route_of[route[idx]] = r
+            pos_of[route[idx]] = idx
+
+    def locate(self, node):
+        """"Return (route, position) of a customer in O(1)"""
+        return self.route_of[node], self.pos_of[node]
+
+    def in_route(self, node, r):
+        """"Check in O(1) whether node is visited by route r (the depot belongs to every route)"""
+        return node == 0 or self.route_of[node] == r
+
+    # undo log
+    def start_log(self):
+        """"Start recording the applied moves (undo log), so that they can be rolled back to the current state"""
+        self.log = []
+        return self
+
+    def commit(self):
+        """"Accept the moves applied since the last commit (or start_log): they can no longer be rolled back"""
+        self.log.clear()
+        return self
+
+    def rollback(self):
+        """"Undo the moves applied since the last commit (or start_log) in reverse order, in O(moves)"""
+        log, self.log = self.log, None  # undo moves without recording them
+        while log:
+            entry = log.pop()
+            if entry[0] == "2opt":
+                _, r, i, j, self.fs, self.dist[r] = entry
+                route = self.s[r]
+                route[i:j + 1] = route[j:i - 1:-1]
+                self.update_index(r, i, j + 1)
+            elif entry[0] == "swap":
+                _, r1, r2, i, j, self.fs, self.dist[r1], self.dist[r2], self.cap[r1], self.cap[r2] = entry
+                route1, route2 = self.s[r1], self.s[r2]
+                route1[i], route2[j] = route2[j], route1[i]
+                self.route_of[route1[i]], self.route_of[route2[j]] = r1, r2
+                self.pos_of[route1[i]], self.pos_of[route2[j]] = i, j
+            elif entry[0] == "best_swap":
+                _, r1, r2, i, j, idx_i, idx_j, self.fs, self.dist[r1], self.dist[r2], self.cap[r1], self.cap[r2] = entry
+                route1, route2 = self.s[r1], self.s[r2]
+                node_j, node_i = route1.pop(idx_j), route2.pop(idx_i)
+                route1.insert(i, node_i)
+                route2.insert(j, node_j)
+                self.update_index(r1, min(i, idx_j))
+                self.update_index(r2, min(j, idx_i))
+        self.log = log
+        return self
+
     # neighborhood moves
     def two_opt_eval(self, cvrp, r, i, j):
         """"Eval 2-opt at indexes i and j (reversion of route segment [i...j])"""
-        fs = self.fs + cvrp.d[self.s[r][i - 1]][self.s[r][j]] + cvrp.d[self.s[r][i]][self.s[r][j + 1]] \
-             - cvrp.d[self.s[r][i - 1]][self.s[r][i]] - cvrp.d[self.s[r][j]][self.s[r][j + 1]]
+        d, route = cvrp.d, self.s[r]
+        fs = self.fs + d[route[i - 1]][route[j]] + d[route[i]][route[j + 1]] \
+             - d[route[i - 1]][route[i]] - d[route[j]][route[j + 1]]
         return fs
 
     def two_opt_move(self, cvrp, r, i, j):
-        """"Do 2-opt move at indexes i and j (reverse route segment [i...j])"""
-        self.fs += cvrp.d[self.s[r][i - 1]][self.s[r][j]] + cvrp.d[self.s[r][i]][self.s[r][j + 1]] \
-                   - cvrp.d[self.s[r][i - 1]][self.s[r][i]] - cvrp.d[self.s[r][j]][self.s[r][j + 1]]
-        self.s[r] = self.s[r][0:i] + list(reversed(self.s[r][i:j + 1])) + self.s[r][j + 1:]
+        """"Do 2-opt move at indexes i and j (reverse route segment [i...j] in place)"""
+        d, route = cvrp.d, self.s[r]
+        delta = d[route[i - 1]][route[j]] + d[route[i]][route[j + 1]] \
+                - d[route[i - 1]][route[i]] - d[route[j]][route[j + 1]]
+        if self.log is not None:
+            self.log.append(("2opt", r, i, j, self.fs, self.dist[r]))
+        self.fs += delta
+        self.dist[r] += delta
+        route[i:j + 1] = route[j:i - 1:-1]
+        self.update_index(r, i, j + 1)
         return self
 
     def inter_swap_eval(self, cvrp, r1, r2, i, j):
         """"Do inter-route swap between indexes i and j if possible."""
-        if self.cap[r1] - cvrp.dem[self.s[r1][i]] + cvrp.dem[self.s[r2][j]] <= cvrp.cap \
-                and self.cap[r2] - cvrp.dem[self.s[r2][j]] + cvrp.dem[self.s[r1][i]] <= cvrp.cap:
+        d, dem, route1, route2 = cvrp.d, cvrp.dem, self.s[r1], self.s[r2]
+        if self.cap[r1] - dem[route1[i]] + dem[route2[j]] <= cvrp.cap \
+                and self.cap[r2] - dem[route2[j]] + dem[route1[i]] <= cvrp.cap:
             # move is feasible w.r.t. vehicle capacity
-            fs = self.fs - cvrp.d[self.s[r1][i - 1]][self.s[r1][i]] - cvrp.d[self.s[r1][i]][self.s[r1][i + 1]] \
-                 - cvrp.d[self.s[r2][j - 1]][self.s[r2][j]] - cvrp.d[self.s[r2][j]][self.s[r2][j + 1]] \
-                 + cvrp.d[self.s[r1][i - 1]][self.s[r2][j]] + cvrp.d[self.s[r2][j]][self.s[r1][i + 1]] \
-                 + cvrp.d[self.s[r2][j - 1]][self.s[r1][i]] + cvrp.d[self.s[r1][i]][self.s[r2][j + 1]]
+            fs = self.fs - d[route1[i - 1]][route1[i]] - d[route1[i]][route1[i + 1]] \
+                 - d[route2[j - 1]][route2[j]] - d[route2[j]][route2[j + 1]] \
+                 + d[route1[i - 1]][route2[j]] + d[route2[j]][route1[i + 1]] \
+                 + d[route2[j - 1]][route1[i]] + d[route1[i]][route2[j + 1]]
             return fs
         else:
             return float("inf")
 
     def inter_swap_move(self, cvrp, r1, r2, i, j):
         """"Do inter-route swap between indexes i and j if possible."""
-        if self.cap[r1] - cvrp.dem[self.s[r1][i]] + cvrp.dem[self.s[r2][j]] <= cvrp.cap \
-                and self.cap[r2] - cvrp.dem[self.s[r2][j]] + cvrp.dem[self.s[r1][i]] <= cvrp.cap:
+        d, dem, route1, route2 = cvrp.d, cvrp.dem, self.s[r1], self.s[r2]
+        if self.cap[r1] - dem[route1[i]] + dem[route2[j]] <= cvrp.cap \
+                and self.cap[r2] - dem[route2[j]] + dem[route1[i]] <= cvrp.cap:
             # move is feasible w.r.t. vehicle capacity
-            self.fs = self.fs - cvrp.d[self.s[r1][i - 1]][self.s[r1][i]] - cvrp.d[self.s[r1][i]][self.s[r1][i + 1]] \
-                      - cvrp.d[self.s[r2][j - 1]][self.s[r2][j]] - cvrp.d[self.s[r2][j]][self.s[r2][j + 1]] \
-                      + cvrp.d[self.s[r1][i - 1]][self.s[r2][j]] + cvrp.d[self.s[r2][j]][self.s[r1][i + 1]] \
-                      + cvrp.d[self.s[r2][j - 1]][self.s[r1][i]] + cvrp.d[self.s[r1][i]][self.s[r2][j + 1]]
-            self.s[r1][i], self.s[r2][j] = self.s[r2][j], self.s[r1][i]
-            self.cap[r1] = self.cap[r1] - cvrp.dem[self.s[r1][i]] + cvrp.dem[self.s[r2][j]]
+            delta_r1 = - d[route1[i - 1]][route1[i]] - d[route1[i]][route1[i + 1]] \
+                       + d[route1[i - 1]][route2[j]] + d[route2[j]][route1[i + 1]]
+            delta_r2 = - d[route2[j - 1]][route2[j]] - d[route2[j]][route2[j + 1]] \
+                       + d[route2[j - 1]][route1[i]] + d[route1[i]][route2[j + 1]]
+            if self.log is not None:
+                self.log.append(("swap", r1, r2, i, j, self.fs, self.dist[r1], self.dist[r2], self.cap[r1],
+                                 self.cap[r2]))
+            self.fs += delta_r1 + delta_r2
+            self.dist[r1] += delta_r1
+            self.dist[r2] += delta_r2
+            self.cap[r1] += dem[route2[j]] - dem[route1[i]]
+            self.cap[r2] += dem[route1[i]] - dem[route2[j]]
+            route1[i], route2[j] = route2[j], route1[i]
+            self.route_of[route1[i]], self.route_of[route2[j]] = r1, r2
+            self.pos_of[route1[i]], self.pos_of[route2[j]] = i, j
         return self
 
-    def inter_best_swap_eval(self, cvrp, r1, r2, i, j):
-        """"Do inter-route swap between indexes i and j if possible."""
-        if self.cap[r1] - cvrp.dem[self.s[r1][i]] + cvrp.dem[self.s[r2][j]] <= cvrp.cap \
-                and self.cap[r2] - cvrp.dem[self.s[r2][j]] + cvrp.dem[self.s[r1][i]] <= cvrp.cap:
-            # save i and j nodes
-            node_i, node_j = self.s[r1][i], self.s[r2][j]
-            # first, remove i and j from their respective routes (they will be added back later)
-            delta = - cvrp.d[self.s[r1][i - 1]][self.s[r1][i]] - cvrp.d[self.s[r1][i]][self.s[r1][i + 1]] + cvrp.d[self.s[r1][i - 1]][self.s[r1][i + 1]] \
-                    - cvrp.d[self.s[r2][j - 1]][self.s[r2][j]] - cvrp.d[self.s[r2][j]][self.s[r2][j + 1]] + cvrp.d[self.s[r2][j - 1]][self.s[r2][j + 1]]
-            self.s[r1].pop(i)
-            self.s[r2].pop(j)
-
-            # find the cheapest insertion for node i
-            delta_best_i = float("inf")
-            best_idx = None
-            for idx in range(1, len(self.s[r2])):
-                delta_idx = cvrp.d[self.s[r2][idx - 1]][node_i] + cvrp.d[node_i][self.s[r2][idx]] - cvrp.d[self.s[r2][idx - 1]][self.s[r2][idx]]
-                if delta_idx < delta_best_i:
-                    delta_best_i = delta_idx
-                    best_idx = idx
-
-            # find the cheapest insertion for node j
-            delta_best_j = float("inf")
-            best_idx = None
-            for idx in range(1, len(self.s[r1])):
-                delta_idx = cvrp.d[self.s[r1][idx - 1]][node_j] + cvrp.d[node_j][self.s[r1][idx]] - cvrp.d[self.s[r1][idx - 1]][self.s[r1][idx]]
-                if delta_idx < delta_best_j:
-                    delta_best_j = delta_idx
-                    best_idx = idx
-
+    def inter_best_swap_eval(self, cvrp, r1, r2, i, j, ins=None):
+        """"Eval inter-route swap between indexes i and j if possible (each node goes to its cheapest position of the
+        other route). Routes are not changed: the removed node is skipped virtually. If the k-cheapest insertions of
+        every node (ins, see best_insertions) are given, each reinsertion is evaluated in O(1)"""
+        d, dem, route1, route2 = cvrp.d, cvrp.dem, self.s[r1], self.s[r2]
+        if self.cap[r1] - dem[route1[i]] + dem[route2[j]] <= cvrp.cap \
+                and self.cap[r2] - dem[route2[j]] + dem[route1[i]] <= cvrp.cap:
+            node_i, node_j = route1[i], route2[j]
+            # first, remove i and j from their respective routes
+            delta_r1 = - d[route1[i - 1]][node_i] - d[node_i][route1[i + 1]] + d[route1[i - 1]][route1[i + 1]]
+            delta_r2 = - d[route2[j - 1]][node_j] - d[node_j][route2[j + 1]] + d[route2[j - 1]][route2[j + 1]]
+            # then, find the cheapest insertion for node i (into r2 without j) and node j (into r1 without i)
+            if ins is None or len(route2) < INS_MIN_LEN:
+                d_i = d[node_i]
+                delta_best_i = d[route2[j - 1]][node_i] + d_i[route2[j + 1]] - d[route2[j - 1]][route2[j + 1]]
+                for idx in itertools.chain(range(1, j), range(j + 2, len(route2))):
+                    delta_idx = d[route2[idx - 1]][node_i] + d_i[route2[idx]] - d[route2[idx - 1]][route2[idx]]
+                    if delta_idx < delta_best_i:
+                        delta_best_i = delta_idx
+            else:
+                delta_best_i = self.best_insertion_without_cached(cvrp, node_i, r2, j, ins)
+            if ins is None or len(route1) < INS_MIN_LEN:
+                d_j = d[node_j]
+                delta_best_j = d[route1[i - 1]][node_j] + d_j[route1[i + 1]] - d[route1[i - 1]][route1[i + 1]]
+                for idx in itertools.chain(range(1, i), range(i + 2, len(route1))):
+                    delta_idx = d[route1[idx - 1]][node_j] + d_j[route1[idx]] - d[route1[idx - 1]][route1[idx]]
+                    if delta_idx < delta_best_j:
+                        delta_best_j = delta_idx
+            else:
+                delta_best_j = self.best_insertion_without_cached(cvrp, node_j, r1, i, ins)
             # get updated cost function
-            fs = self.fs + delta + delta_best_i + delta_best_j
-
-            # add i and j back to the solution
-            self.s[r1].insert(i, node_i)
-            self.s[r2].insert(j, node_j)
+            fs = self.fs + (delta_r1 + delta_r2 + delta_best_i + delta_best_j)
             return fs
         else:
             return float("inf")
 
+    def best_insertion_without_cached(self, cvrp, node, r, j, ins):
+        """"Cost of the cheapest insertion of node into route r as if the node at index j were removed, in O(1) from the
+        k-cheapest insertions of node into r (k >= 3 ensures one of them does not touch the removed node). Insertions
+        of a node into route r are computed on first use"""
+        d, route = cvrp.d, self.s[r]
+        delta_best = d[route[j - 1]][node] + d[node][route[j + 1]] - d[route[j - 1]][route[j + 1]]
+        if ins[r] is None:
+            ins[r] = {}
+        if node not in ins[r]:
+            ins[r][node] = self.route_insertions(cvrp, r, node)
+        costs, positions = ins[r][node]
+        for delta_idx, idx in zip(costs, positions):
+            if idx != j and idx != j + 1:
+                if delta_idx < delta_best:
+                    delta_best = delta_idx
+                break
+        return delta_best
+
+    def best_insertions(self):
+        """"Return an (initially empty) cache of the k-cheapest insertions of nodes into each route, filled per node and
+        route on first use. The entries of a route are valid while it does not change: holders of the cache drop them
+        (ins[r] = None) for the routes changed by moves"""
+        return [None] * len(self.s)
+
+    def route_insertions(self, cvrp, r, node, k=3):
+        """"Compute the k cheapest insertions of node into route r as (costs, positions), sorted lists (inserting at
+        position idx means between idx - 1 and idx)"""
+        D = cvrp.d_arr
+        a = np.asarray(self.s[r])
+        cost = D[a[:-1], node].astype(np.float64) + D[node, a[1:]] - D[a[:-1], a[1:]]
+        m = min(k, len(cost))
+        idx = np.argpartition(cost, m - 1)[:m] if m < len(cost) else np.arange(m)
+        idx = idx[np.argsort(cost[idx], kind="stable")]
+        return cost[idx].tolist(), (idx + 1).tolist()
+
     def inter_best_swap_move(self, cvrp, r1, r2, i, j):
         """"Do inter-route swap between indexes i and j if possible."""
-        if self.cap[r1] - cvrp.dem[self.s[r1][i]] + cvrp.dem[self.s[r2][j]] <= cvrp.cap \
-                and self.cap[r2] - cvrp.dem[self.s[r2][j]] + cvrp.dem[self.s[r1][i]] <= cvrp.cap:
+        d, dem, route1, route2 = cvrp.d, cvrp.dem, self.s[r1], self.s[r2]
+        if self.cap[r1] - dem[route1[i]] + dem[route2[j]] <= cvrp.cap \
+                and self.cap[r2] - dem[route2[j]] + dem[route1[i]] <= cvrp.cap:
             # save i and j nodes
-            node_i, node_j = self.s[r1][i], self.s[r2][j]
+            node_i, node_j = route1[i], route2[j]
             # first, remove i and j from their respective routes
-            delta = - cvrp.d[self.s[r1][i - 1]][self.s[r1][i]] - cvrp.d[self.s[r1][i]][self.s[r1][i + 1]] + cvrp.d[self.s[r1][i - 1]][self.s[r1][i + 1]] \
-                    - cvrp.d[self.s[r2][j - 1]][self.s[r2][j]] - cvrp.d[self.s[r2][j]][self.s[r2][j + 1]] + cvrp.d[self.s[r2][j - 1]][self.s[r2][j + 1]]
-            self.s[r1].pop(i)
-            self.s[r2].pop(j)
+            delta_r1 = - d[route1[i - 1]][route1[i]] - d[route1[i]][route1[i + 1]] + d[route1[i - 1]][route1[i + 1]]
+            delta_r2 = - d[route2[j - 1]][route2[j]] - d[route2[j]][route2[j + 1]] + d[route2[j - 1]][route2[j + 1]]
+            route1.pop(i)
+            route2.pop(j)
 
             # find and perform the cheapest insertion for node i
             delta_best_i = float("inf")
             best_idx = None
-            for idx in range(1, len(self.s[r2])):
-                delta_idx = cvrp.d[self.s[r2][idx - 1]][node_i] + cvrp.d[node_i][self.s[r2][idx]] - cvrp.d[self.s[r2][idx - 1]][self.s[r2][idx]]
+            d_i = d[node_i]
+            for idx in range(1, len(route2)):
+                delta_idx = d[route2[idx - 1]][node_i] + d_i[route2[idx]] - d[route2[idx - 1]][route2[idx]]
                 if delta_idx < delta_best_i:
                     delta_best_i = delta_idx
                     best_idx = idx
-            self.s[r2].insert(best_idx, node_i)
+            route2.insert(best_idx, node_i)
+            self.update_index(r2, min(j, best_idx))
 
             # find and perform the cheapest insertion for node j
             delta_best_j = float("inf")
             best_idx = None
-            for idx in range(1, len(self.s[r1])):
-                delta_idx = cvrp.d[self.s[r1][idx - 1]][node_j] + cvrp.d[node_j][self.s[r1][idx]] - cvrp.d[self.s[r1][idx - 1]][self.s[r1][idx]]
+            d_j = d[node_j]
+            for idx in range(1, len(route1)):
+                delta_idx = d[route1[idx - 1]][node_j] + d_j[route1[idx]] - d[route1[idx - 1]][route1[idx]]
                 if delta_idx < delta_best_j:
                     delta_best_j = delta_idx
                     best_idx = idx
-            self.s[r1].insert(best_idx, node_j)
+            route1.insert(best_idx, node_j)
+            self.update_index(r1, min(i, best_idx))
+            if self.log is not None:
+                self.log.append(("best_swap", r1, r2, i, j, self.pos_of[node_i], best_idx, self.fs,
+                                 self.dist[r1], self.dist[r2], self.cap[r1], self.cap[r2]))
 
-            # update cost function and capacities
-            self.fs += delta + delta_best_i + delta_best_j
-            self.cap[r1] = self.cap[r1] - cvrp.dem[self.s[r1][i]] + cvrp.dem[self.s[r2][j]]
+            # update cost function, route distances and capacities
+            self.fs += delta_r1 + delta_r2 + delta_best_i + delta_best_j
+            self.dist[r1] += delta_r1 + delta_best_j
+            self.dist[r2] += delta_r2 + delta_best_i
+            self.cap[r1] += dem[node_j] - dem[node_i]
+            self.cap[r2] += dem[node_i] - dem[node_j]
         return self
 
     def move_to_neighbor(self, N, cvrp):
@@ -142,6 +330,7 @@ class Solution:
 
     def obj_eval(self, cvrp):
         """"Full evaluation of objective function"""
+        d, dem = cvrp.d, cvrp.dem
         rota_cap = []
         rota_dist = []
         fs = 0
@@ -149,8 +338,8 @@ class Solution:
             aux_dist = 0
             aux_cap = 0
             for i in range(len(self.s[rota]) - 1):
-                aux_dist += cvrp.d[self.s[rota][i]][self.s[rota][i + 1]]
-                aux_cap += cvrp.dem[self.s[rota][i]]
+                aux_dist += d[self.s[rota][i]][self.s[rota][i + 1]]
+                aux_cap += dem[self.s[rota][i]]
             rota_dist.append(aux_dist)
             rota_cap.append(aux_cap)
             fs += aux_dist
@@ -4,14 +4,16 @@ from bokeh.plotting import figure, show, save, output_file
 import solution
 import cvrp
 
-def read_cvrp(file_path):
+def read_cvrp(file_path, rounding=False, dtype=np.float64):
     """"Read a CVRP instance in TSPLIB95 format
-    http://comopt.ifi.uni-heidelberg.de/software/TSPLIB95/tsp95.pdf"""
+    http://comopt.ifi.uni-heidelberg.de/software/TSPLIB95/tsp95.pdf
+    If rounding is set, distances follow the TSPLIB convention of the instance EDGE_WEIGHT_TYPE
+    (EUC_2D, CEIL_2D or ATT); otherwise exact euclidean distances are used"""
     file = open(file_path, "r")
     cap = None
-    d = []
     dem = []
     coord = []
+    edge_weight_type = "EUC_2D"
     mode = "NODE_COORD"
     for line in file:
         if line.find("EDGE_WEIGHT_SECTION") != -1:
@@ -19,6 +21,8 @@ def read_cvrp(file_path):
             break
         if line.find("NODE_COORD_SECTION") != -1:
             break
+        if line.find("EDGE_WEIGHT_TYPE") != -1:
+            edge_weight_type = line.split(":")[-1].strip()
         if line.find("CAPACITY") != -1:
             line = line.strip().replace("\t", " ").split(" ")
             cap = float(line[-1])
@@ -35,14 +39,40 @@ def read_cvrp(file_path):
             break
         line = line.strip().replace("\t", " ").split(" ")
         dem.append(float(line[-1]))
-    n = len(coord)
-    d = [[0 for _ in range(n)] for _ in range(n)]
-    for (i, xi, yi) in coord:
-        for (j, xj, yj) in coord:
-            if i != j:
-                d[i - 1][j - 1] = ((xi - xj) ** 2 + (yi - yj) ** 2) ** (1 / 2)
+    d = dist_matrix(coord, edge_weight_type if rounding else None, dtype)
     return d, dem, cap, coord
 
+
+def dist_matrix(coord, edge_weight_type=None, dtype=np.float64, block=1024):
+    """"Build the distance matrix of a list of (i, x, y) coordinates as a contiguous ndarray.
+    Rows are computed in blocks (broadcasting) to bound temporary memory on large instances.
+    edge_weight_type selects the TSPLIB95 rounding convention: None (exact euclidean), EUC_2D
+    (nearest integer), CEIL_2D (ceiling) or ATT (pseudo-euclidean)"""
+    if edge_weight_type not in (None, "EUC_2D", "CEIL_2D", "ATT"):
+        raise ValueError(f"Unsupported EDGE_WEIGHT_TYPE for rounding: {edge_weight_type}")
+    n = len(coord)
+    xy = np.empty((n, 2), dtype=np.float64)
+    for (i, x, y) in coord:
+        xy[i - 1] = (x, y)
+    d = np.empty((n, n), dtype=dtype)
+    for b in range(0, n, block):
+        delta = xy[b:b + block, np.newaxis, :] - xy[np.newaxis, :, :]
+        dist = np.einsum("ijk,ijk->ij", delta, delta)
+        if edge_weight_type == "ATT":
+            dist = np.sqrt(dist / 10.0)
+            nint = np.floor(dist + 0.5)
+            dist = np.where(nint < dist, nint + 1, nint)
+        else:
+            np.sqrt(dist, out=dist)
+            if edge_weight_type == "EUC_2D":
+                dist = np.floor(dist + 0.5)
+            elif edge_weight_type == "CEIL_2D":
+                np.ceil(dist, out=dist)
+        d[b:b + block] = dist
+    np.fill_diagonal(d, 0)
+    return d
+
+
 def read_soln(file_path, inst):
     """"Read a CVRP instance in TSPLIB95 .sol format
     http://comopt.ifi.uni-heidelberg.de/software/TSPLIB95/tsp95.pdf"""
@@ -60,7 +90,13 @@ def read_soln(file_path, inst):
                 s.append(route)
             elif line[0] == "C":
                 fs = float(line.split(" ")[1].strip())
-        soln = solution.Solution(s, fs, None)
+        soln = solution.Solution(s, fs)
+        # route caches and cost are evaluated from the instance (the file cost may use rounded distances)
+        soln.eval_routes(inst)
+        soln.fs = sum(soln.dist)
+        if not soln.is_feasible(inst):
+            print("Solution file violates the vehicle capacity.\nAborting execution...")
+            exit(0)
     except IOError:
         print("Solution file could not be read.\nAborting execution...")
         exit(0)